@@ -1,5 +1,7 @@
 import os
 
+import pytest
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 root_dir_content = os.listdir(BASE_DIR)
 PROJECT_DIR_NAME = 'yatube'
@@ -36,4 +38,22 @@ assert any(app in INSTALLED_APPS for app in ['posts.apps.PostsConfig', 'posts'])
 pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
+    'tests.fixtures.fixture_budget',
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Кеш не откатывается вместе с базой: каждый тест начинает с чистого."""
+    from django.core.cache import cache
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def sync_thumbnails(settings, tmp_path):
+    """Миниатюры в тестах создаются сразу: фоновый поток пережил бы базу.
+
+    Загрузки и миниатюры пишутся во временный каталог, а не в media/.
+    """
+    settings.THUMBNAIL_SYNC = True
+    settings.MEDIA_ROOT = str(tmp_path)
@@ -0,0 +1,59 @@
+import pytest
+from posts.models import Comment, Follow, Post
+
+from core.middleware import QueryBudgetExceeded
+
+
+@pytest.fixture
+def budget_data(user, another_user, group, django_user_model):
+    """Посты, комментарии и подписки для замера бюджетов в худшем случае.
+
+    У автора больше 333 постов — столько SQLite вставляет одним
+    bulk_create, — а у пишущего пользователя есть подписчики.
+    """
+    for number in range(12):
+        Post.objects.create(
+            text=f'Пост автора {number} #бюджет', author=another_user, group=group
+        )
+    for number in range(340):
+        Post.objects.create(text=f'Старый пост {number}', author=another_user)
+    followed = django_user_model.objects.create_user(username='Followed')
+    for number in range(3):
+        Post.objects.create(text=f'Пост подписки {number}', author=followed)
+    for number in range(20):
+        reader = django_user_model.objects.create_user(
+            username=f'Reader{number}'
+        )
+        Follow.objects.create(user=reader, author=user)
+    posts = [
+        Post.objects.create(text=f'Свой пост {number}', author=user)
+        for number in range(3)
+    ]
+    for number in range(5):
+        Comment.objects.create(
+            post=posts[0], author=another_user, text=f'Комментарий {number}'
+        )
+    Follow.objects.create(user=user, author=followed)
+    return {
+        'slug': group.slug,
+        'username': another_user.username,
+        'post_id': posts[0].pk,
+        'name': 'бюджет',
+    }
+
+
+@pytest.fixture
+def assert_query_budget(settings):
+    """Запрос к странице, который падает при превышении бюджета view."""
+    settings.QUERY_BUDGET_ENABLED = True
+    settings.QUERY_BUDGET_RAISE = True
+
+    def check(client, url, data=None):
+        try:
+            if data is None:
+                return client.get(url)
+            return client.post(url, data)
+        except QueryBudgetExceeded as e:
+            assert False, f'Превышен бюджет запросов: {e}'
+
+    return check
@@ -0,0 +1,35 @@
+import pytest
+from django.urls import reverse
+from posts.urls import urlpatterns
+
+pytestmark = [pytest.mark.django_db]
+
+POST_DATA = {
+    'post_create': {'text': 'Новый пост'},
+    'post_edit': {'text': 'Исправленный пост'},
+    'add_comment': {'text': 'Новый комментарий'},
+}
+
+
+class TestQueryBudget:
+
+    @pytest.mark.parametrize(
+        'pattern', urlpatterns, ids=[item.name for item in urlpatterns]
+    )
+    def test_view_within_budget(
+        self, user_client, budget_data, assert_query_budget, pattern
+    ):
+        assert getattr(pattern.callback, 'query_budget', None), (
+            f'Объявите бюджет запросов для view `{pattern.name}` '
+            'декоратором `@query_budget`'
+        )
+        url = reverse(
+            f'posts:{pattern.name}',
+            kwargs={
+                name: budget_data[name]
+                for name in pattern.pattern.converters
+            },
+        )
+        assert_query_budget(user_client, url)
+        if pattern.name in POST_DATA:
+            assert_query_budget(user_client, url, POST_DATA[pattern.name])
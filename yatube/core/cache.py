@@ -0,0 +1,313 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS cache_entries (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expires REAL,
+        accessed REAL NOT NULL,
+        size INTEGER NOT NULL
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS cache_entries_accessed
+    ON cache_entries (accessed)
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS cache_totals (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        entries INTEGER NOT NULL,
+        size INTEGER NOT NULL
+    )
+    ''',
+    'INSERT OR IGNORE INTO cache_totals VALUES (1, 0, 0)',
+    '''
+    CREATE TRIGGER IF NOT EXISTS cache_entries_inserted
+    AFTER INSERT ON cache_entries BEGIN
+        UPDATE cache_totals
+        SET entries = entries + 1, size = size + NEW.size;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS cache_entries_deleted
+    AFTER DELETE ON cache_entries BEGIN
+        UPDATE cache_totals
+        SET entries = entries - 1, size = size - OLD.size;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS cache_entries_resized
+    AFTER UPDATE OF size ON cache_entries BEGIN
+        UPDATE cache_totals SET size = size + NEW.size - OLD.size;
+    END
+    ''',
+)
+UPSERT = '''
+    INSERT INTO cache_entries (key, value, expires, accessed, size)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (key) DO UPDATE SET
+        value = excluded.value,
+        expires = excluded.expires,
+        accessed = excluded.accessed,
+        size = excluded.size
+'''
+ALIVE = '(expires IS NULL OR expires > ?)'
+# Не больше стольких параметров в одном запросе (старые SQLite — 999)
+CHUNK = 500
+
+
+def chunks(items, size=CHUNK):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class SQLiteCache(BaseCache):
+    """Кеш в файле SQLite (WAL), общий для всех процессов на машине.
+
+    В отличие от LocMemCache, все WSGI-воркеры видят одни и те же
+    данные. Размер ограничен числом записей (MAX_ENTRIES) и, по желанию,
+    байтами (OPTIONS['MAX_SIZE']); при переполнении вытесняются давно
+    не читанные записи (LRU). incr атомарен между процессами.
+    """
+
+    # Время чтения обновляем не чаще раза в столько секунд, чтобы
+    # каждое попадание в кеш не превращалось в запись на диск
+    ACCESS_RESOLUTION = 1.0
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.path = location
+        self.max_size = options.get('MAX_SIZE')
+        self.busy_timeout = options.get('BUSY_TIMEOUT', 5)
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        # Соединение своё у каждого потока и у каждого процесса после fork
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, timeout=self.busy_timeout, isolation_level=None,
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            with self.transaction(connection):
+                for statement in SCHEMA:
+                    connection.execute(statement)
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    @contextmanager
+    def transaction(self, connection=None):
+        connection = connection or self.connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def encode(self, value):
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def fetch(self, keys):
+        """{ключ: значение} живых записей; заодно отмечает их чтение."""
+        now = time.time()
+        found = {}
+        for part in chunks(keys):
+            marks = ', '.join('?' * len(part))
+            rows = self.connection.execute(
+                f'SELECT key, value, accessed FROM cache_entries '
+                f'WHERE key IN ({marks}) AND {ALIVE}',
+                (*part, now),
+            ).fetchall()
+            stale = []
+            for key, value, accessed in rows:
+                found[key] = pickle.loads(value)
+                if accessed < now - self.ACCESS_RESOLUTION:
+                    stale.append(key)
+            if stale:
+                marks = ', '.join('?' * len(stale))
+                self.connection.execute(
+                    f'UPDATE cache_entries SET accessed = ? '
+                    f'WHERE key IN ({marks})',
+                    (now, *stale),
+                )
+        return found
+
+    def store(self, connection, items, timeout):
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        rows = []
+        for key, value in items:
+            blob = self.encode(value)
+            rows.append((key, blob, expires, now, len(blob)))
+        connection.executemany(UPSERT, rows)
+
+    def cull(self, connection):
+        """Выкидывает просроченные, затем давно не читанные записи."""
+        entries, size = connection.execute(
+            'SELECT entries, size FROM cache_totals'
+        ).fetchone()
+        over_entries = entries > self._max_entries
+        over_size = self.max_size is not None and size > self.max_size
+        if not (over_entries or over_size):
+            return
+        connection.execute(
+            'DELETE FROM cache_entries WHERE expires <= ?', (time.time(),)
+        )
+        entries, size = connection.execute(
+            'SELECT entries, size FROM cache_totals'
+        ).fetchone()
+        if entries > self._max_entries:
+            # Как и встроенные бэкенды, чистим с запасом: 1/CULL_FREQUENCY
+            excess = entries - self._max_entries
+            excess += self._max_entries // max(self._cull_frequency, 1)
+            connection.execute(
+                'DELETE FROM cache_entries WHERE key IN ('
+                'SELECT key FROM cache_entries ORDER BY accessed LIMIT ?)',
+                (excess,),
+            )
+            size, = connection.execute(
+                'SELECT size FROM cache_totals'
+            ).fetchone()
+        if self.max_size is not None and size > self.max_size:
+            target = self.max_size
+            target -= self.max_size // max(self._cull_frequency, 1)
+            victims = []
+            rows = connection.execute(
+                'SELECT key, size FROM cache_entries ORDER BY accessed'
+            )
+            for key, entry_size in rows:
+                if size <= target:
+                    break
+                victims.append(key)
+                size -= entry_size
+            rows.close()
+            for part in chunks(victims):
+                marks = ', '.join('?' * len(part))
+                connection.execute(
+                    f'DELETE FROM cache_entries WHERE key IN ({marks})', part
+                )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self.transaction() as connection:
+            connection.execute(
+                'DELETE FROM cache_entries WHERE key = ? AND expires <= ?',
+                (key, time.time()),
+            )
+            if connection.execute(
+                'SELECT 1 FROM cache_entries WHERE key = ?', (key,)
+            ).fetchone():
+                return False
+            self.store(connection, [(key, value)], timeout)
+            self.cull(connection)
+        return True
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self.fetch([key]).get(key, default)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self.transaction() as connection:
+            self.store(connection, [(key, value)], timeout)
+            self.cull(connection)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self.transaction() as connection:
+            cursor = connection.execute(
+                f'UPDATE cache_entries SET expires = ? '
+                f'WHERE key = ? AND {ALIVE}',
+                (self.get_backend_timeout(timeout), key, time.time()),
+            )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self.transaction() as connection:
+            connection.execute(
+                'DELETE FROM cache_entries WHERE key = ?', (key,)
+            )
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self.connection.execute(
+            f'SELECT 1 FROM cache_entries WHERE key = ? AND {ALIVE}',
+            (key, time.time()),
+        ).fetchone() is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self.transaction() as connection:
+            row = connection.execute(
+                f'SELECT value FROM cache_entries WHERE key = ? AND {ALIVE}',
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            blob = self.encode(value)
+            connection.execute(
+                'UPDATE cache_entries SET value = ?, size = ?, accessed = ? '
+                'WHERE key = ?',
+                (blob, len(blob), time.time(), key),
+            )
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_key(key, version=version): key for key in keys}
+        for key in keys:
+            self.validate_key(key)
+        return {
+            keys[key]: value
+            for key, value in self.fetch(list(keys)).items()
+        }
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        items = []
+        for key, value in data.items():
+            key = self.make_key(key, version=version)
+            self.validate_key(key)
+            items.append((key, value))
+        with self.transaction() as connection:
+            self.store(connection, items, timeout)
+            self.cull(connection)
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_key(key, version=version) for key in keys]
+        for key in keys:
+            self.validate_key(key)
+        with self.transaction() as connection:
+            for part in chunks(keys):
+                marks = ', '.join('?' * len(part))
+                connection.execute(
+                    f'DELETE FROM cache_entries WHERE key IN ({marks})', part
+                )
+
+    def clear(self):
+        with self.transaction() as connection:
+            connection.execute('DELETE FROM cache_entries')
@@ -0,0 +1,14 @@
+from collections import namedtuple
+
+QueryBudget = namedtuple('QueryBudget', ('queries', 'time'))
+
+
+def query_budget(queries, time=None):
+    """Объявляет бюджет view: число SQL-запросов и время в базе (мс).
+
+    Проверяет бюджет core.middleware.QueryBudgetMiddleware.
+    """
+    def decorator(view):
+        view.query_budget = QueryBudget(queries, time)
+        return view
+    return decorator
@@ -0,0 +1,112 @@
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from django.core.management.commands.createcachetable import (
+    Command as CreateCacheTable,
+)
+from django.db import connections
+
+from core.cache import SQLiteCache
+
+BACKENDS = ('sqlite', 'locmem', 'file', 'db')
+BENCH_TABLE = 'core_bench_cache'
+
+
+def build(backend, location, max_entries):
+    params = {'OPTIONS': {'MAX_ENTRIES': max_entries}}
+    if backend == 'sqlite':
+        return SQLiteCache(os.path.join(location, 'bench.sqlite3'), params)
+    if backend == 'locmem':
+        return LocMemCache('bench', params)
+    if backend == 'file':
+        return FileBasedCache(os.path.join(location, 'files'), params)
+    return DatabaseCache(BENCH_TABLE, params)
+
+
+def work(task):
+    """Один процесс: смесь чтений (с заполнением при промахе), записей
+    и инкрементов по ключам с перекошенной популярностью."""
+    backend, location, max_entries, operations, keys, seed = task
+    cache = build(backend, location, max_entries)
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(keys)]
+    picks = rng.choices(range(keys), weights, k=operations)
+    payload = 'x' * 512
+    hits = reads = errors = 0
+    started = time.perf_counter()
+    for key in picks:
+        roll = rng.random()
+        try:
+            if roll < 0.8:
+                reads += 1
+                if cache.get(f'key:{key}') is None:
+                    cache.set(f'key:{key}', payload)
+                else:
+                    hits += 1
+            elif roll < 0.9:
+                cache.set(f'key:{key}', payload)
+            else:
+                cache.add(f'counter:{key % 10}', 0)
+                cache.incr(f'counter:{key % 10}')
+        except Exception:
+            # Например, «database is locked» у бэкенда на основной БД
+            errors += 1
+    return hits, reads, errors, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает бэкенды кеша под нагрузкой из нескольких процессов: '
+        'операций в секунду, доля попаданий и число ошибок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--operations', type=int, default=5000)
+        parser.add_argument('--keys', type=int, default=2000)
+        parser.add_argument('--max-entries', type=int, default=1000)
+        parser.add_argument(
+            '--backend', action='append', choices=BACKENDS,
+            help='Какие бэкенды сравнивать (по умолчанию все).',
+        )
+
+    def handle(self, *args, **options):
+        creator = CreateCacheTable()
+        creator.verbosity = 0
+        creator.create_table('default', BENCH_TABLE, False)
+        context = multiprocessing.get_context('fork')
+        try:
+            for backend in options['backend'] or BACKENDS:
+                with tempfile.TemporaryDirectory() as location:
+                    build(backend, location, options['max_entries']).clear()
+                    # Дочерние процессы не должны делить соединение родителя
+                    connections.close_all()
+                    tasks = [
+                        (backend, location, options['max_entries'],
+                         options['operations'], options['keys'], seed)
+                        for seed in range(options['processes'])
+                    ]
+                    with context.Pool(options['processes']) as pool:
+                        results = pool.map(work, tasks)
+                self.report(backend, results, options['operations'])
+        finally:
+            with connections['default'].cursor() as cursor:
+                cursor.execute(f'DROP TABLE IF EXISTS {BENCH_TABLE}')
+
+    def report(self, backend, results, per_process):
+        hits = sum(result[0] for result in results)
+        reads = sum(result[1] for result in results)
+        errors = sum(result[2] for result in results)
+        elapsed = max(result[3] for result in results)
+        operations = len(results) * per_process
+        self.stdout.write(
+            f'{backend:>7}: {operations / elapsed:10.0f} оп/с, '
+            f'попаданий {hits / max(reads, 1):6.1%}, ошибок {errors}'
+        )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from core import stampede
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает счётчики защиты кеша от одновременного пересчёта: '
+        'пересчёты, отданные устаревшие значения и ожидания блокировки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Обнулить счётчики после вывода.',
+        )
+
+    def handle(self, *args, **options):
+        for name, value in stampede.metrics().items():
+            self.stdout.write(f'{name:>16}: {value}')
+        if options['reset']:
+            stampede.reset_metrics()
@@ -0,0 +1,56 @@
+import re
+
+from django.conf import settings
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def file_etag(stat):
+    """Сильный ETag из времени изменения и размера файла."""
+    return '"{:x}-{:x}"'.format(stat.st_mtime_ns, stat.st_size)
+
+
+def cache_control(path):
+    """Заголовок Cache-Control: миниатюры неизменны, имена уникальны."""
+    if path.startswith(settings.MEDIA_IMMUTABLE_PREFIXES):
+        return 'public, max-age=31536000, immutable'
+    return f'public, max-age={settings.MEDIA_MAX_AGE}'
+
+
+def parse_range(header, size):
+    """(начало, конец включительно) из заголовка Range.
+
+    Вернёт None, если заголовок не разобран или диапазонов несколько —
+    тогда отдаём файл целиком, как разрешает RFC 7233. Если диапазон
+    не пересекается с файлом, вызывает ValueError (ответ 416).
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-500 — последние 500 байт
+        length = int(last)
+        if length == 0:
+            raise ValueError('Пустой суффиксный диапазон')
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('Диапазон за пределами файла')
+    return start, end
+
+
+def read_range(path, start, length):
+    """Читает length байт с позиции start кусками по CHUNK_SIZE."""
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
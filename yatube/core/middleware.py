@@ -0,0 +1,78 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Служебные команды транзакций (ATOMIC_REQUESTS, тесты) бюджет не тратят
+SERVICE_STATEMENTS = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryStats:
+    """Обёртка execute_wrapper: считает запросы и время в базе."""
+
+    def __init__(self):
+        self.queries = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if not sql.lstrip().upper().startswith(SERVICE_STATEMENTS):
+                self.queries += 1
+                self.time += (time.perf_counter() - started) * 1000
+
+
+class QueryBudgetMiddleware:
+    """Следит, чтобы view укладывался в бюджет из @query_budget.
+
+    Включается настройкой QUERY_BUDGET_ENABLED; при превышении пишет
+    предупреждение в лог или, с QUERY_BUDGET_RAISE, бросает исключение.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_BUDGET_ENABLED:
+            return self.get_response(request)
+        stats = QueryStats()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        budget = getattr(request, 'query_budget', None)
+        if budget is not None:
+            self.check(request, budget, stats)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = getattr(view_func, 'query_budget', None)
+
+    def check(self, request, budget, stats):
+        problems = []
+        if stats.queries > budget.queries:
+            problems.append(
+                f'{stats.queries} запросов при бюджете {budget.queries}'
+            )
+        if budget.time is not None and stats.time > budget.time:
+            problems.append(
+                f'{stats.time:.1f} мс в базе при бюджете {budget.time} мс'
+            )
+        if not problems:
+            return
+        message = '{} {}: {}'.format(
+            request.method, request.path, ', '.join(problems)
+        )
+        if settings.QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
@@ -0,0 +1,148 @@
+import math
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+METRICS = (
+    'recomputes',
+    'early_recomputes',
+    'stale_serves',
+    'lock_waits',
+    'lock_wait_ms',
+)
+# Пауза между проверками, пока значение считает другой процесс
+POLL_INTERVAL = 0.05
+
+
+def metric_key(name):
+    return f'stampede:{name}'
+
+
+def record(name, amount=1, cache=None):
+    """Прибавляет к счётчику метрики, общему для всех процессов."""
+    cache = cache or default_cache
+    key = metric_key(name)
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        if not cache.add(key, amount, None):
+            cache.incr(key, amount)
+
+
+def metrics(cache=None):
+    """Текущие значения всех метрик: {имя: число}."""
+    cache = cache or default_cache
+    found = cache.get_many([metric_key(name) for name in METRICS])
+    return {name: found.get(metric_key(name), 0) for name in METRICS}
+
+
+def reset_metrics(cache=None):
+    cache = cache or default_cache
+    cache.delete_many([metric_key(name) for name in METRICS])
+
+
+def refresh_early(expires, delta, now):
+    """Вероятностный досрочный пересчёт (XFetch).
+
+    Чем ближе срок и чем дольше считается значение, тем вероятнее, что
+    один из запросов пересчитает его заранее, пока остальные получают
+    ещё свежее.
+    """
+    beta = settings.STAMPEDE_BETA
+    return now - delta * beta * math.log(1.0 - random.random()) >= expires
+
+
+def remember(key, compute, timeout=DEFAULT_TIMEOUT, cache=None):
+    """Значение из кеша, а при промахе — compute() ровно в одном процессе.
+
+    Пересчёт берёт блокировку через cache.add. Остальные процессы в это
+    время отдают устаревшее значение (оно хранится ещё
+    STAMPEDE_STALE_TIMEOUT секунд после срока), а если его нет —
+    ждут до STAMPEDE_WAIT секунд, пока значение появится.
+    """
+    cache = cache or default_cache
+    if timeout is DEFAULT_TIMEOUT:
+        timeout = cache.default_timeout
+    if timeout is not None and timeout <= 0:
+        return compute()
+    entry = cache.get(key)
+    now = time.time()
+    if entry is not None:
+        value, expires, delta = entry
+        if expires is None or not refresh_early(expires, delta, now):
+            return value
+        if not acquire(key, cache):
+            if now >= expires:
+                record('stale_serves', cache=cache)
+            return value
+        if now < expires:
+            record('early_recomputes', cache=cache)
+        return recompute(key, compute, timeout, cache)
+    if acquire(key, cache):
+        return recompute(key, compute, timeout, cache)
+    entry = wait(key, cache)
+    if entry is not None:
+        return entry[0]
+    # Владелец блокировки не успел: считаем сами, а не отдаём ошибку
+    return recompute(key, compute, timeout, cache, locked=False)
+
+
+def lock_key(key):
+    return f'{key}:lock'
+
+
+def acquire(key, cache):
+    return cache.add(lock_key(key), 1, settings.STAMPEDE_LOCK_TIMEOUT)
+
+
+def wait(key, cache):
+    started = time.time()
+    deadline = started + settings.STAMPEDE_WAIT
+    entry = None
+    while entry is None and time.time() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+    record('lock_waits', cache=cache)
+    record('lock_wait_ms', int((time.time() - started) * 1000), cache)
+    return entry
+
+
+def recompute(key, compute, timeout, cache, locked=True):
+    started = time.time()
+    try:
+        value = compute()
+        delta = time.time() - started
+        if timeout is None:
+            expires = stored_for = None
+        else:
+            expires = time.time() + timeout
+            stored_for = timeout + settings.STAMPEDE_STALE_TIMEOUT
+        cache.set(key, (value, expires, delta), stored_for)
+    finally:
+        if locked:
+            cache.delete(lock_key(key))
+    record('recomputes', cache=cache)
+    return value
+
+
+def cached(key, timeout=DEFAULT_TIMEOUT):
+    """Декоратор: результат функции через remember().
+
+    key — функция от тех же аргументов, возвращающая ключ кеша; если она
+    вернёт None, результат не кешируется.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key = key(*args, **kwargs)
+            if cache_key is None:
+                return func(*args, **kwargs)
+            return remember(
+                cache_key, lambda: func(*args, **kwargs), timeout
+            )
+        return wrapper
+    return decorator
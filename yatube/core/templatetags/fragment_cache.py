@@ -0,0 +1,68 @@
+from django import template
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.templatetags.cache import CacheNode, do_cache
+
+from core.stampede import remember
+
+register = template.Library()
+
+
+class StampedeCacheNode(CacheNode):
+    """{% cache %}, пересчитывающий фрагмент в одном процессе за раз."""
+
+    def fragment_cache(self, context):
+        if self.cache_name:
+            cache_name = self.cache_name.resolve(context)
+            try:
+                return caches[cache_name]
+            except InvalidCacheBackendError:
+                raise template.TemplateSyntaxError(
+                    'Invalid cache name specified for cache tag: %r'
+                    % cache_name
+                )
+        try:
+            return caches['template_fragments']
+        except InvalidCacheBackendError:
+            return caches['default']
+
+    def render(self, context):
+        try:
+            expire_time = self.expire_time_var.resolve(context)
+        except template.VariableDoesNotExist:
+            raise template.TemplateSyntaxError(
+                '"cache" tag got an unknown variable: %r'
+                % self.expire_time_var.var
+            )
+        if expire_time is not None:
+            try:
+                expire_time = int(expire_time)
+            except (ValueError, TypeError):
+                raise template.TemplateSyntaxError(
+                    '"cache" tag got a non-integer timeout value: %r'
+                    % expire_time
+                )
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        return remember(
+            make_template_fragment_key(self.fragment_name, vary_on),
+            lambda: self.nodelist.render(context),
+            expire_time,
+            self.fragment_cache(context),
+        )
+
+
+@register.tag('cache')
+def do_stampede_cache(parser, token):
+    """Замена {% cache %} с тем же синтаксисом: {% load fragment_cache %}.
+
+    Пока фрагмент пересчитывает один процесс, остальные отдают прежнюю
+    версию или ждут её, а не рендерят блок все разом.
+    """
+    node = do_cache(parser, token)
+    return StampedeCacheNode(
+        node.nodelist,
+        node.expire_time_var,
+        node.fragment_name,
+        node.vary_on,
+        node.cache_name,
+    )
@@ -0,0 +1,104 @@
+import multiprocessing
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..cache import SQLiteCache
+
+
+def increment(location):
+    cache = SQLiteCache(location, {})
+    for _ in range(50):
+        cache.incr('counter')
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = os.path.join(directory.name, 'cache.sqlite3')
+        self.cache = self.make_cache()
+        # Часы идут на секунду за вызов: порядок LRU однозначен
+        self.now = 1_000_000
+        patcher = mock.patch('core.cache.time.time', self.tick)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tick(self):
+        self.now += 1
+        return self.now
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_get_set_delete(self):
+        """Значения переживают pickle, delete и clear их убирают."""
+        self.cache.set('post', {'id': 1, 'text': 'Текст'})
+        self.assertEqual(self.cache.get('post'), {'id': 1, 'text': 'Текст'})
+        self.assertTrue(self.cache.has_key('post'))
+        self.cache.delete('post')
+        self.assertIsNone(self.cache.get('post'))
+        self.cache.set('post', 1)
+        self.cache.clear()
+        self.assertEqual(self.cache.get('post', 'нет'), 'нет')
+
+    def test_timeout(self):
+        """Просроченная запись не видна и уступает место add."""
+        self.cache.set('old', 1, timeout=10)
+        self.assertEqual(self.cache.get('old'), 1)
+        self.now += 60
+        self.assertIsNone(self.cache.get('old'))
+        self.assertTrue(self.cache.add('old', 2))
+        self.assertFalse(self.cache.add('old', 3))
+        self.assertEqual(self.cache.get('old'), 2)
+        self.assertTrue(self.cache.touch('old', None))
+        self.assertFalse(self.cache.touch('missing'))
+
+    def test_many(self):
+        """get_many и set_many работают пачками."""
+        data = {f'key:{number}': number for number in range(1200)}
+        cache = self.make_cache(MAX_ENTRIES=5000)
+        cache.set_many(data)
+        found = cache.get_many([*data, 'missing'])
+        self.assertEqual(found, data)
+        cache.delete_many(list(data)[:600])
+        self.assertEqual(len(cache.get_many(list(data))), 600)
+
+    def test_incr(self):
+        """incr атомарен и требует существующий ключ."""
+        with self.assertRaises(ValueError):
+            self.cache.incr('counter')
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter', 5), 6)
+        self.assertEqual(self.cache.decr('counter'), 5)
+
+    def test_incr_across_processes(self):
+        """Инкременты из разных процессов не теряются."""
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        with context.Pool(4) as pool:
+            pool.map(increment, [self.location] * 4)
+        self.assertEqual(self.cache.get('counter'), 200)
+
+    def test_lru_eviction(self):
+        """При переполнении уходит давно не читанная запись."""
+        cache = self.make_cache(MAX_ENTRIES=3, CULL_FREQUENCY=100)
+        for key in 'abc':
+            cache.set(key, key)
+        cache.get('a')
+        cache.set('d', 'd')
+        self.assertEqual(sorted(cache.get_many('abcd')), ['a', 'c', 'd'])
+
+    def test_size_limit(self):
+        """MAX_SIZE ограничивает объём значений в байтах."""
+        cache = self.make_cache(MAX_SIZE=5000)
+        for number in range(20):
+            cache.set(number, 'x' * 1000)
+        total = cache.connection.execute(
+            'SELECT size FROM cache_totals'
+        ).fetchone()[0]
+        self.assertLessEqual(total, 5000)
+        self.assertEqual(cache.get(19), 'x' * 1000)
+        self.assertIsNone(cache.get(0))
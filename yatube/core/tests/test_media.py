@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+CONTENT = bytes(range(256)) * 4
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'))
+        with open(os.path.join(TEMP_MEDIA_ROOT, 'posts', 'a.jpg'), 'wb') as f:
+            f.write(CONTENT)
+        with open(os.path.join(TEMP_MEDIA_ROOT, 'secret.txt'), 'wb') as f:
+            f.write(b'secret')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_full_file(self):
+        """Файл отдаётся целиком с валидаторами и Cache-Control."""
+        response = self.client.get('/media/posts/a.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=86400')
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+
+    def test_not_modified(self):
+        """Совпавший If-None-Match даёт 304 без тела."""
+        etag = self.client.get('/media/posts/a.jpg')['ETag']
+        response = self.client.get(
+            '/media/posts/a.jpg', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_range(self):
+        """Диапазон байтов отдаётся со статусом 206."""
+        response = self.client.get(
+            '/media/posts/a.jpg', HTTP_RANGE='bytes=10-19'
+        )
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[10:20])
+        self.assertEqual(
+            response['Content-Range'], f'bytes 10-19/{len(CONTENT)}'
+        )
+        self.assertEqual(response['Content-Length'], '10')
+
+    def test_suffix_range(self):
+        response = self.client.get(
+            '/media/posts/a.jpg', HTTP_RANGE='bytes=-100'
+        )
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[-100:])
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(
+            '/media/posts/a.jpg', HTTP_RANGE=f'bytes={len(CONTENT)}-'
+        )
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_stale_if_range(self):
+        """Если файл изменился после If-Range, отдаётся весь файл."""
+        response = self.client.get(
+            '/media/posts/a.jpg',
+            HTTP_RANGE='bytes=0-9',
+            HTTP_IF_RANGE='"stale"',
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_head(self):
+        response = self.client.head('/media/posts/a.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(response.content, b'')
+
+    def test_forbidden_paths(self):
+        """Вне MEDIA_SERVE_PREFIXES и за пределами MEDIA_ROOT — 404."""
+        for url in (
+            '/media/secret.txt',
+            '/media/posts/../secret.txt',
+            '/media/posts/%2e%2e/secret.txt',
+            '/media/posts/missing.jpg',
+            '/media/posts/',
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_post_not_allowed(self):
+        self.assertEqual(
+            self.client.post('/media/posts/a.jpg').status_code, 405
+        )
+
+    @override_settings(MEDIA_SENDFILE='x-accel-redirect')
+    def test_x_accel_redirect(self):
+        """С nginx тело не отдаётся, только внутренний редирект."""
+        response = self.client.get('/media/posts/a.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected-media/posts/a.jpg'
+        )
+        self.assertEqual(response.content, b'')
+
+    @override_settings(MEDIA_SENDFILE='x-sendfile')
+    def test_x_sendfile(self):
+        response = self.client.get('/media/posts/a.jpg')
+        self.assertEqual(
+            response['X-Sendfile'],
+            os.path.join(TEMP_MEDIA_ROOT, 'posts', 'a.jpg'),
+        )
+
+    def test_thumbnails_are_immutable(self):
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'cache'), exist_ok=True)
+        with open(os.path.join(TEMP_MEDIA_ROOT, 'cache', 't.jpg'), 'wb') as f:
+            f.write(b'thumb')
+        response = self.client.get('/media/cache/t.jpg')
+        self.assertIn('immutable', response['Cache-Control'])
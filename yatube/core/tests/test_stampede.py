@@ -0,0 +1,114 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from .. import stampede
+
+
+@override_settings(STAMPEDE_WAIT=1)
+class StampedeTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def clock(self, now):
+        # Подменяем часы только в stampede: бэкенд кеша живёт по настоящим
+        return mock.patch(
+            'core.stampede.time',
+            mock.Mock(time=lambda: now, sleep=time.sleep),
+        )
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def test_remember_caches(self):
+        """Повторный запрос берёт значение из кеша."""
+        self.assertEqual(stampede.remember('key', self.compute, 60), 1)
+        self.assertEqual(stampede.remember('key', self.compute, 60), 1)
+        self.assertEqual(stampede.metrics()['recomputes'], 1)
+
+    def test_stale_while_revalidate(self):
+        """Пока пересчёт у другого процесса, отдаётся старое значение."""
+        stampede.remember('key', self.compute, 60)
+        stampede.acquire('key', cache)
+        with self.clock(time.time() + 10 ** 4):
+            self.assertEqual(stampede.remember('key', self.compute, 60), 1)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(stampede.metrics()['stale_serves'], 1)
+        cache.delete(stampede.lock_key('key'))
+        with self.clock(time.time() + 10 ** 4):
+            self.assertEqual(stampede.remember('key', self.compute, 60), 2)
+
+    def test_early_refresh(self):
+        """Незадолго до срока значение пересчитывается заранее."""
+        now = time.time()
+        cache.set('key', ('old', now + 10, 100))
+        with self.clock(now), mock.patch(
+            'core.stampede.random', mock.Mock(random=lambda: 0.5)
+        ):
+            self.assertEqual(stampede.remember('key', self.compute, 60), 1)
+        self.assertEqual(stampede.metrics()['early_recomputes'], 1)
+        # Далеко до срока — старое значение
+        cache.set('key', ('old', now + 3600, 1))
+        with self.clock(now):
+            self.assertEqual(stampede.remember('key', self.compute, 60), 'old')
+
+    def test_single_flight(self):
+        """Одновременные промахи считают значение один раз."""
+        started = threading.Event()
+
+        def slow():
+            started.set()
+            threading.Event().wait(0.3)
+            return self.compute()
+
+        results = []
+        owner = threading.Thread(
+            target=lambda: results.append(
+                stampede.remember('key', slow, 60)
+            )
+        )
+        owner.start()
+        started.wait()
+        results.append(stampede.remember('key', self.compute, 60))
+        owner.join()
+        self.assertEqual(results, [1, 1])
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(stampede.metrics()['lock_waits'], 1)
+
+    def test_cached_decorator(self):
+        """Декоратор кеширует по ключу, None в ключе отключает кеш."""
+        def key(number):
+            return f'square:{number}' if number else None
+
+        @stampede.cached(key, 60)
+        def square(number):
+            self.calls += 1
+            return number * number
+
+        self.assertEqual(square(3), 9)
+        self.assertEqual(square(3), 9)
+        square(0)
+        square(0)
+        self.assertEqual(self.calls, 3)
+
+    def test_template_tag(self):
+        """{% cache %} из fragment_cache — замена встроенного тега."""
+        template = Template(
+            '{% load fragment_cache %}'
+            '{% cache 60 fragment name %}{{ value }}{% endcache %}'
+        )
+        self.assertEqual(
+            template.render(Context({'name': 'a', 'value': 1})), '1'
+        )
+        self.assertEqual(
+            template.render(Context({'name': 'a', 'value': 2})), '1'
+        )
+        self.assertEqual(
+            template.render(Context({'name': 'b', 'value': 2})), '2'
+        )
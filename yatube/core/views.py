@@ -1,4 +1,20 @@
+import mimetypes
+import os
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.http import (FileResponse, Http404, HttpResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import render
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .media import cache_control, file_etag, parse_range, read_range
 
 
 def page_not_found(request, exception):
@@ -11,3 +27,99 @@ def csrf_failure(request, reason=''):
 
 def server_error(request, reason=''):
     return render(request, 'core/505.html')
+
+
+def permission_denied(request, exception):
+    return render(request, 'core/403.html', status=403)
+
+
+def if_range_matches(request, etag, last_modified):
+    """Range применяется, только если файл не менялся с If-Range."""
+    header = request.META.get('HTTP_IF_RANGE')
+    if not header:
+        return True
+    if header == etag:
+        return True
+    return parse_http_date_safe(header) == last_modified
+
+
+def media_file_response(request, path, full_path, size, etag,
+                        last_modified):
+    content_type = (
+        mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    )
+    if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+        # Байты, Range и HEAD отдаёт nginx из internal location
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(
+            path
+        )
+        return response
+    if settings.MEDIA_SENDFILE == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+        return response
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+        response['Content-Length'] = size
+        return response
+    header = request.META.get('HTTP_RANGE')
+    byte_range = None
+    if header and if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    if byte_range is None:
+        # FileResponse отдаёт файл через wsgi.file_wrapper (sendfile)
+        return FileResponse(
+            open(full_path, 'rb'), content_type=content_type
+        )
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        read_range(full_path, start, end - start + 1),
+        status=206,
+        content_type=content_type,
+    )
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = end - start + 1
+    return response
+
+
+@transaction.non_atomic_requests
+@require_safe
+def media(request, path):
+    """Файлы постов и миниатюр: Range, ETag, долгий кеш и sendfile.
+
+    Отдаются только каталоги из MEDIA_SERVE_PREFIXES. С MEDIA_SENDFILE
+    сами байты передаются фронтовому прокси.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        file_stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404
+    # Префикс проверяем у нормализованного пути: posts/../ его не обойдёт
+    path = os.path.relpath(full_path, os.path.abspath(settings.MEDIA_ROOT))
+    path = path.replace(os.sep, '/')
+    if not path.startswith(settings.MEDIA_SERVE_PREFIXES):
+        raise Http404
+    if not stat.S_ISREG(file_stat.st_mode):
+        raise Http404
+    etag = file_etag(file_stat)
+    last_modified = int(file_stat.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = media_file_response(
+            request, path, full_path, file_stat.st_size, etag,
+            last_modified,
+        )
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = cache_control(path)
+    response['Accept-Ranges'] = 'bytes'
+    return response
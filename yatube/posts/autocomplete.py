@@ -0,0 +1,210 @@
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+from django.urls import NoReverseMatch, reverse
+
+from .generations import generation_key, initial_generation
+from .models import Group, User
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = generation_key('autocomplete')
+USER_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def normalize(text):
+    return text.casefold().replace('ё', 'е').strip()
+
+
+class PrefixIndex:
+    """Отсортированный список термов с поиском по префиксу.
+
+    Термы лежат парами (терм, id записи), поэтому записи с одинаковым
+    термом соседствуют, а все термы с префиксом — один отрезок списка,
+    который находит bisect.
+    """
+
+    def __init__(self):
+        self.terms = []
+        self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, entry_id, entry, terms):
+        self.remove(entry_id)
+        terms = {normalize(term) for term in terms} - {''}
+        self.entries[entry_id] = (entry, terms)
+        for term in terms:
+            insort(self.terms, (term, entry_id))
+
+    def remove(self, entry_id):
+        _, terms = self.entries.pop(entry_id, (None, ()))
+        for term in terms:
+            position = bisect_left(self.terms, (term, entry_id))
+            del self.terms[position]
+
+    def get(self, entry_id):
+        return self.entries.get(entry_id, (None, None))[0]
+
+    def search(self, prefix, limit):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        found = {}
+        position = bisect_left(self.terms, (prefix,))
+        while position < len(self.terms) and len(found) < limit:
+            term, entry_id = self.terms[position]
+            if not term.startswith(prefix):
+                break
+            found.setdefault(entry_id, self.entries[entry_id][0])
+            position += 1
+        return list(found.values())
+
+
+def url(view_name, arg):
+    # Слаг, заведённый в обход валидации, не должен ронять сохранение
+    try:
+        return reverse(view_name, args=(arg,))
+    except NoReverseMatch:
+        return None
+
+
+def user_entry(user):
+    full_name = user.get_full_name()
+    entry = {
+        'type': 'user',
+        'label': full_name or user.username,
+        'username': user.username,
+        'url': url('posts:profile', user.username),
+    }
+    terms = [user.username, user.first_name, user.last_name, full_name]
+    return ('user', user.pk), entry, terms
+
+
+def group_entry(group):
+    entry = {
+        'type': 'group',
+        'label': group.title,
+        'slug': group.slug,
+        'url': url('posts:group_list', group.slug),
+    }
+    terms = [group.title, group.slug, *group.title.split()]
+    return ('group', group.pk), entry, terms
+
+
+def build():
+    """Собирает индекс двумя запросами: пользователи и группы."""
+    index = PrefixIndex()
+    users = User.objects.only(*USER_FIELDS).order_by()
+    for user in users.iterator():
+        index.add(*user_entry(user))
+    groups = Group.objects.only('title', 'slug').order_by()
+    for group in groups.iterator():
+        index.add(*group_entry(group))
+    return index
+
+
+class ProcessIndex:
+    """Индекс процесса и его поколение в общем кеше.
+
+    Процесс, в котором сработал сигнал, правит свой индекс на месте
+    и сдвигает поколение; остальные процессы сверяются с поколением
+    не чаще раза в AUTOCOMPLETE_CHECK_INTERVAL секунд и при расхождении
+    пересобирают индекс. Между проверками запрос не трогает ни базу,
+    ни кеш.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.index = None
+        self.generation = None
+        self.checked = 0.0
+
+    def get(self):
+        now = time.monotonic()
+        interval = settings.AUTOCOMPLETE_CHECK_INTERVAL
+        with self.lock:
+            if self.index is None or now - self.checked >= interval:
+                generation = self.shared_generation()
+                if self.index is None or generation != self.generation:
+                    self.index = build()
+                    self.generation = generation
+                self.checked = now
+            return self.index
+
+    def shared_generation(self):
+        generation = cache.get(GENERATION_KEY)
+        if generation is None:
+            # Как и у фрагментов, начинаем со времени: вытесненный счётчик
+            # не совпадёт с поколением, которое помнят другие процессы
+            cache.add(GENERATION_KEY, initial_generation(), None)
+            generation = cache.get(GENERATION_KEY)
+        return generation
+
+    def apply(self, change):
+        """Применяет правку к индексу и сдвигает общее поколение."""
+        with self.lock:
+            try:
+                generation = cache.incr(GENERATION_KEY)
+            except ValueError:
+                cache.add(GENERATION_KEY, initial_generation(), None)
+                generation = None
+            if (self.index is not None and self.generation is not None
+                    and generation == self.generation + 1):
+                change(self.index)
+                self.generation = generation
+            else:
+                # Пропустили чужую правку: соберём индекс заново
+                self.index = None
+
+    def reset(self):
+        with self.lock:
+            self.index = None
+
+
+process_index = ProcessIndex()
+
+
+def warm():
+    """Собирает индекс при старте процесса, до первого запроса."""
+    try:
+        process_index.get()
+    except DatabaseError:
+        logger.exception('Индекс автодополнения не собран')
+
+
+def suggest(prefix, limit=None):
+    return process_index.get().search(
+        prefix, limit or settings.AUTOCOMPLETE_LIMIT
+    )
+
+
+def update(entry_id, entry, terms):
+    index = process_index.index
+    if index is not None and index.get(entry_id) == entry:
+        # Сохранили без изменения имён (например, last_login при входе)
+        return
+    # Откаченная транзакция не должна оставить в индексе призраков
+    transaction.on_commit(lambda: process_index.apply(
+        lambda index: index.add(entry_id, entry, terms)
+    ))
+
+
+def remove(entry_id):
+    transaction.on_commit(lambda: process_index.apply(
+        lambda index: index.remove(entry_id)
+    ))
+
+
+def update_user(user):
+    update(*user_entry(user))
+
+
+def update_group(group):
+    update(*group_entry(group))
@@ -0,0 +1,103 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+
+def change(model, pk, **deltas):
+    """Атомарно сдвигает счётчики строки через F(), без чтения в Python."""
+    if pk is None:
+        return
+    model.objects.filter(pk=pk).update(**{
+        field: F(field) + delta for field, delta in deltas.items()
+    })
+
+
+def post_added(post):
+    with transaction.atomic():
+        change(AuthorStats, post.author_id, posts_count=1)
+        change(Group, post.group_id, posts_count=1)
+
+
+def post_removed(post):
+    with transaction.atomic():
+        change(AuthorStats, post.author_id, posts_count=-1)
+        change(Group, post.group_id, posts_count=-1)
+
+
+def post_regrouped(old_group_id, new_group_id):
+    with transaction.atomic():
+        change(Group, old_group_id, posts_count=-1)
+        change(Group, new_group_id, posts_count=1)
+
+
+def comment_added(comment):
+    change(Post, comment.post_id, comments_count=1)
+
+
+def comment_removed(comment):
+    change(Post, comment.post_id, comments_count=-1)
+
+
+def follow_added(follow):
+    with transaction.atomic():
+        change(AuthorStats, follow.author_id, followers_count=1)
+        change(AuthorStats, follow.user_id, following_count=1)
+
+
+def follow_removed(follow):
+    with transaction.atomic():
+        change(AuthorStats, follow.author_id, followers_count=-1)
+        change(AuthorStats, follow.user_id, following_count=-1)
+
+
+def stats_for(user):
+    """Счётчики пользователя; недостающую строку пересчитывает и создаёт."""
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        recount_users(User.objects.filter(pk=user.pk))
+        return AuthorStats.objects.get(user=user)
+
+
+def count_of(queryset, field):
+    """Подзапрос «число строк queryset на OuterRef('pk')» для UPDATE."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0,
+    )
+
+
+def recount_users(users=None):
+    users = users if users is not None else User.objects.all()
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(user_id=pk) for pk in users.values_list('pk', flat=True)],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    return AuthorStats.objects.filter(user__in=users).update(
+        posts_count=count_of(Post.objects.all(), 'author'),
+        followers_count=count_of(Follow.objects.all(), 'author'),
+        following_count=count_of(Follow.objects.all(), 'user'),
+    )
+
+
+def recount():
+    """Пересчитывает все счётчики разом, по одному UPDATE на таблицу."""
+    with transaction.atomic():
+        return {
+            'users': recount_users(),
+            'groups': Group.objects.update(
+                posts_count=count_of(Post.objects.all(), 'group')
+            ),
+            'posts': Post.objects.update(
+                comments_count=count_of(Comment.objects.all(), 'post')
+            ),
+        }
@@ -0,0 +1,101 @@
+import csv
+import json
+import zlib
+
+from .models import Post
+
+# Столбцы выгрузки: имя в файле и поле для values_list. Имена совпадают
+# с полями import_content, так что выгрузку можно загрузить обратно
+COLUMNS = (
+    ('id', 'id'),
+    ('author', 'author__username'),
+    ('group', 'group__slug'),
+    ('pub_date', 'pub_date'),
+    ('text', 'text'),
+    ('image', 'image'),
+    ('comments_count', 'comments_count'),
+)
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+BUFFER_SIZE = 64 * 1024
+
+
+def rows(queryset, chunk_size=2000):
+    """Строки выгрузки в порядке публикации, по chunk_size из курсора.
+
+    values_list не создаёт объекты моделей, а iterator не копит
+    результат в кеше QuerySet, поэтому память не растёт с таблицей.
+    """
+    fields = [field for _, field in COLUMNS]
+    names = [name for name, _ in COLUMNS]
+    values = queryset.order_by('pub_date', 'id').values_list(*fields)
+    for row in values.iterator(chunk_size=chunk_size):
+        yield dict(zip(names, row))
+
+
+class Echo:
+    """«Файл» для csv.writer, который возвращает строку, а не пишет её."""
+
+    def write(self, value):
+        return value
+
+
+def as_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow([name for name, _ in COLUMNS])
+    for row in rows:
+        row['pub_date'] = row['pub_date'].isoformat()
+        yield writer.writerow(row.values())
+
+
+def as_jsonl(rows):
+    for row in rows:
+        row = dict(type='post', **row)
+        row['pub_date'] = row['pub_date'].isoformat()
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def buffered(lines, size=BUFFER_SIZE):
+    """Склеивает строки в куски около size байт: меньше мелких записей."""
+    parts, length = [], 0
+    for line in lines:
+        data = line.encode()
+        parts.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(parts)
+            parts, length = [], 0
+    if parts:
+        yield b''.join(parts)
+
+
+def gzipped(chunks):
+    """Сжимает поток в формат gzip по мере чтения, без буфера на весь файл."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream(queryset, file_format='csv', compress=False, chunk_size=2000):
+    """Байтовый поток выгрузки постов queryset."""
+    writer = as_csv if file_format == 'csv' else as_jsonl
+    chunks = buffered(writer(rows(queryset, chunk_size)))
+    return gzipped(chunks) if compress else chunks
+
+
+def filename(name, file_format, compress=False):
+    return f'{name}.{file_format}' + ('.gz' if compress else '')
+
+
+def posts_of(author=None, group=None):
+    queryset = Post.objects.all()
+    if author is not None:
+        queryset = queryset.filter(author=author)
+    if group is not None:
+        queryset = queryset.filter(group=group)
+    return queryset
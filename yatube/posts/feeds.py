@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import pull, timeline
+from .follows import follower_ids, following_ids
+from .models import Comment, Post
+from .paginators import CursorPaginator
+
+DEFAULT_ORDERING = ('-pub_date', '-id')
+# Комментарии идут от старых к новым по индексу (post, created, id)
+COMMENT_ORDERING = ('created', 'id')
+# Поля карточки поста (posts/includes/type.html и ссылки в лентах);
+# остальные столбцы, включая хэш пароля автора, не выбираем
+CARD_FIELDS = (
+    'text', 'pub_date', 'modified', 'image', 'image_width', 'image_height',
+    'author', 'group',
+    'author__username', 'author__first_name', 'author__last_name',
+    'group__title', 'group__slug',
+)
+
+
+def count_key(feed, owner_id=None):
+    """Ключ кеша с числом постов ленты: index, group, author или follow."""
+    if owner_id is None:
+        return f'feed_count:{feed}'
+    return f'feed_count:{feed}:{owner_id}'
+
+
+def forget_count_keys(*keys):
+    """Удаляет размеры лент сразу и ещё раз после фиксации транзакции.
+
+    Запрос, посчитавший ленту по старым строкам до коммита, иначе
+    вернул бы устаревшее число в кеш.
+    """
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def forget_counts(post, old_group_id=None, followers=None):
+    """Сбрасывает кешированные размеры лент, в которые входит пост.
+
+    followers — уже прочитанные id подписчиков автора, если есть.
+    """
+    keys = [count_key('index'), count_key('author', post.author_id)]
+    for group_id in {post.group_id, old_group_id} - {None}:
+        keys.append(count_key('group', group_id))
+    if followers is None:
+        followers = follower_ids(post.author_id)
+    keys.extend(count_key('follow', user_id) for user_id in followers)
+    forget_count_keys(*keys)
+
+
+def with_cards(queryset):
+    """Посты ленты вместе с авторами и группами одним запросом."""
+    return queryset.select_related('author', 'group').only(*CARD_FIELDS)
+
+
+def comments_page(post_id, cursor=None):
+    """Страница комментариев поста по курсору, вместе с авторами."""
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    ).only('text', 'created', 'post', 'author__username')
+    return CursorPaginator(
+        comments, settings.COMMENTS_PAGE, COMMENT_ORDERING
+    ).get_page(cursor)
+
+
+def follow_feed(user, engine=None):
+    """Лента подписок выбранным движком и порядок для курсора.
+
+    join — выборка по закешированному множеству подписок, timeline —
+    материализованная лента (fan-out при записи), merge — слияние
+    кешированных списков авторов (pull при чтении).
+    """
+    engine = engine or settings.FOLLOW_FEED_ENGINE
+    if engine == 'merge':
+        return (
+            pull.MergedFeed(pull.merged_ids(user), with_cards(Post.objects)),
+            DEFAULT_ORDERING,
+        )
+    if engine == 'join':
+        return (
+            with_cards(Post.objects.filter(
+                author_id__in=list(following_ids(user))
+            )),
+            DEFAULT_ORDERING,
+        )
+    return with_cards(timeline.follow_feed(user)), timeline.FEED_ORDERING
@@ -0,0 +1,85 @@
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Follow
+
+FOLLOW_SET_TIMEOUT = 60 * 60
+# Беззнаковые 32-битные id: 4 байта на автора
+TYPECODE = 'I'
+
+
+def follow_set_key(user_id):
+    return f'follow_set:{user_id}'
+
+
+class FollowSet(Sequence):
+    """Отсортированные id авторов, на которых подписан пользователь.
+
+    В кеше хранится как байты массива array('I'); проверка подписки —
+    двоичный поиск в памяти, без запроса к базе.
+    """
+
+    def __init__(self, ids=()):
+        self.ids = array(TYPECODE, sorted(ids))
+
+    @classmethod
+    def from_bytes(cls, raw):
+        follow_set = cls()
+        follow_set.ids.frombytes(raw)
+        return follow_set
+
+    def to_bytes(self):
+        return self.ids.tobytes()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        return self.ids[index]
+
+    def __contains__(self, author_id):
+        index = bisect_left(self.ids, author_id)
+        return index < len(self.ids) and self.ids[index] == author_id
+
+
+def following_ids(user):
+    """Множество подписок пользователя: из кеша или одним запросом."""
+    if not user.is_authenticated:
+        return FollowSet()
+    key = follow_set_key(user.pk)
+    raw = cache.get(key)
+    if raw is not None:
+        return FollowSet.from_bytes(raw)
+    follow_set = FollowSet(
+        Follow.objects.filter(user=user).values_list('author_id', flat=True)
+    )
+    cache.set(key, follow_set.to_bytes(), FOLLOW_SET_TIMEOUT)
+    return follow_set
+
+
+def follower_ids(author_id):
+    return list(
+        Follow.objects.filter(author_id=author_id)
+        .values_list('user_id', flat=True)
+    )
+
+
+def is_following(user, author):
+    return author.pk in following_ids(user)
+
+
+def forget(user_id):
+    """Сбрасывает закешированное множество после записи подписки.
+
+    Ключ удаляется сразу и ещё раз после фиксации транзакции: запрос,
+    успевший прочитать из базы старые подписки до коммита, не оставит
+    их в кеше. Правка на месте через get/set не атомарна и пережила бы
+    откат транзакции.
+    """
+    key = follow_set_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
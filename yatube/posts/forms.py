@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from .images import ingest
 from .models import Comment, Post
 
 
@@ -23,6 +25,12 @@ class PostForm(forms.ModelForm):
             )
         return self.cleaned_data['text']
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return ingest(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,96 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+GENERATION_TIMEOUT = None
+
+
+def generation_key(scope, owner_id=None):
+    """Ключ счётчика поколений: index, group, author, post или user.
+
+    user сдвигается только при смене имени — от него зависят карточки.
+    """
+    if owner_id is None:
+        return f'generation:{scope}'
+    return f'generation:{scope}:{owner_id}'
+
+
+def initial_generation():
+    # Начинаем со времени, а не с единицы: если счётчик вытеснят из кеша,
+    # новое поколение не совпадёт со старым и не поднимет его фрагменты
+    return int(time.time() * 1000)
+
+
+def current_many(keys):
+    """Текущие поколения ключей словарём; недостающие заводятся."""
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, initial_generation(), GENERATION_TIMEOUT)
+            found[key] = cache.get(key)
+    return found
+
+
+def current(*keys):
+    """Текущие поколения ключей одной строкой для ключа фрагмента."""
+    found = current_many(keys)
+    return '.'.join(str(found[key]) for key in keys)
+
+
+def bump(*keys):
+    """Сдвигает поколения: фрагменты со старыми ключами больше не читаются.
+
+    Сдвиг делается сразу и ещё раз после фиксации транзакции: страница,
+    собранная до коммита из старых данных, сохранится под поколением,
+    которое уже никто не прочитает.
+    """
+    advance(keys)
+    transaction.on_commit(lambda: advance(keys))
+
+
+def advance(keys):
+    """Сдвигает поколения и запоминает время изменения для Last-Modified."""
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, initial_generation(), GENERATION_TIMEOUT)
+    now = int(time.time())
+    cache.set_many(
+        {modified_key(key): now for key in keys}, GENERATION_TIMEOUT
+    )
+
+
+def modified_key(key):
+    return f'{key}:modified'
+
+
+def last_modified(*keys):
+    """Время последнего изменения по сигналам; неизвестное — «сейчас»."""
+    now = int(time.time())
+    found = cache.get_many([modified_key(key) for key in keys])
+    for key in keys:
+        if modified_key(key) not in found:
+            cache.add(modified_key(key), now, GENERATION_TIMEOUT)
+    return max(found.values(), default=now)
+
+
+def fragment_context(*keys):
+    return {
+        'generation': current(*keys),
+        'fragment_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
+    }
+
+
+def post_keys(post, old_group_id=None):
+    """Поколения всех страниц, на которых виден пост."""
+    keys = [
+        generation_key('index'),
+        generation_key('author', post.author_id),
+        generation_key('post', post.pk),
+    ]
+    for group_id in {post.group_id, old_group_id} - {None}:
+        keys.append(generation_key('group', group_id))
+    return keys
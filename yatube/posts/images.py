@@ -0,0 +1,106 @@
+import os
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation, ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.images import get_image_dimensions
+from PIL import Image, ImageOps
+
+# Расширения, с которыми сохраняются обработанные оригиналы
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png'}
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 80, 'method': 4},
+    'AVIF': {'quality': 60},
+}
+
+
+@lru_cache(maxsize=None)
+def writable_formats():
+    """Форматы, которые умеет записывать этот Pillow."""
+    try:
+        # AVIF в старых Pillow приносит необязательный плагин
+        import pillow_avif  # noqa: F401
+    except ImportError:
+        pass
+    Image.init()
+    return frozenset(Image.SAVE)
+
+
+def variant_formats():
+    """Форматы из IMAGE_VARIANTS, которые умеет записывать этот Pillow."""
+    formats = writable_formats()
+    return [name for name in settings.IMAGE_VARIANTS if name in formats]
+
+
+def target_format(image, source_format):
+    if source_format in ('JPEG', 'PNG'):
+        return source_format
+    has_alpha = image.mode in ('RGBA', 'LA', 'P')
+    return 'PNG' if has_alpha else 'JPEG'
+
+
+def encode(image, image_format, icc_profile=None):
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    elif image_format != 'PNG' and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    options = dict(SAVE_OPTIONS.get(image_format, {}))
+    if icc_profile:
+        options['icc_profile'] = icc_profile
+    buffer = BytesIO()
+    # Метаданные (EXIF с координатами, комментарии) не передаём —
+    # в файл попадают только пиксели и цветовой профиль
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def ingest(upload):
+    """Проверяет и ужимает загруженное изображение перед сохранением.
+
+    Размер в пикселях читается из заголовка, и «бомба» отклоняется до
+    декодирования. JPEG декодируется в режиме draft сразу с уменьшением,
+    сторона ограничивается IMAGE_MAX_SIDE, EXIF-поворот применяется,
+    а сами метаданные отбрасываются. Анимацию сохраняем как есть.
+    """
+    if upload.size > settings.IMAGE_MAX_UPLOAD_SIZE:
+        raise ValidationError('Файл изображения слишком большой')
+    upload.seek(0)
+    with Image.open(upload) as source:
+        width, height = source.size
+        if width * height > settings.IMAGE_MAX_PIXELS:
+            raise ValidationError(
+                f'Слишком большое изображение: {width}×{height} пикселей'
+            )
+        if getattr(source, 'is_animated', False):
+            upload.seek(0)
+            return upload
+        source_format = source.format
+        icc_profile = source.info.get('icc_profile')
+        limit = settings.IMAGE_MAX_SIDE
+        # Для JPEG декодер сразу уменьшит картинку в 2, 4 или 8 раз
+        source.draft('RGB', (limit, limit))
+        try:
+            image = ImageOps.exif_transpose(source)
+        except (SyntaxError, ValueError):
+            image = source.copy()
+        image.thumbnail((limit, limit), Image.LANCZOS)
+        image_format = target_format(image, source_format)
+        content = encode(image, image_format, icc_profile)
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    return ContentFile(content, name=f'{stem}.{EXTENSIONS[image_format]}')
+
+
+def dimensions(image):
+    """(ширина, высота) файла поля или (None, None), если не читается."""
+    try:
+        size = get_image_dimensions(image)
+    except (OSError, ValueError, SuspiciousFileOperation):
+        return None, None
+    finally:
+        if getattr(image, '_committed', False):
+            image.close()
+    return size
@@ -0,0 +1,332 @@
+import csv
+import json
+from collections import Counter
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_slug
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Follow, Group, ImportCheckpoint, Post, User
+
+KINDS = ('post', 'comment', 'follow')
+MAX_ERRORS = 20
+
+
+class RecordError(ValueError):
+    pass
+
+
+def read_jsonl(file):
+    for line in file:
+        line = line.strip()
+        yield json.loads(line) if line else None
+
+
+def read_csv(file, kind=None):
+    """Строки CSV как записи; без столбца type у всех вид kind."""
+    for row in csv.DictReader(file):
+        row = {key: value for key, value in row.items() if value != ''}
+        if kind and 'type' not in row:
+            row['type'] = kind
+        yield row
+
+
+def parse_date(value):
+    if value is None:
+        return None
+    date = parse_datetime(value) if isinstance(value, str) else None
+    if date is None:
+        raise RecordError(f'неверная дата {value!r}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def required(record, field):
+    value = record.get(field)
+    if value in (None, ''):
+        raise RecordError(f'нет поля {field}')
+    return value
+
+
+def valid(value, field, validator, max_length):
+    """Значение, которое примет модель и развернёт URL, иначе RecordError.
+
+    bulk_create не вызывает валидаторы полей: группа «Русская
+    литература» или имя со «/» сломали бы reverse во всех лентах.
+    """
+    try:
+        validator(value)
+    except ValidationError:
+        raise RecordError(f'неверное поле {field}: {value!r}')
+    if len(value) > max_length:
+        raise RecordError(f'поле {field} длиннее {max_length} символов')
+    return value
+
+
+def username(record, field):
+    return valid(
+        required(record, field), field, User.username_validator,
+        User._meta.get_field('username').max_length,
+    )
+
+
+def group_slug(record, field):
+    value = record.get(field)
+    if value in (None, ''):
+        return None
+    return valid(
+        value, field, validate_slug, Group._meta.get_field('slug').max_length
+    )
+
+
+def next_id(model):
+    """Первый свободный id таблицы, включая id удалённых строк.
+
+    bulk_create в SQLite не возвращает первичные ключи, поэтому id
+    назначаются заранее: по ним привязываются комментарии и ставятся
+    исходные даты. Вызывается внутри транзакции пачки, уже взявшей
+    блокировку записи.
+    """
+    last = model.objects.aggregate(last=Max('id'))['last'] or 0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT seq FROM sqlite_sequence WHERE name = %s',
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    return max(last, row[0] if row else 0) + 1
+
+
+class Importer:
+    """Пакетный импорт постов, комментариев и подписок.
+
+    Авторы и группы разрешаются через словари в памяти, недостающие
+    создаются пачкой; каждая пачка записей вставляется bulk_create
+    в одной транзакции вместе с позицией источника.
+    """
+
+    def __init__(self, source):
+        self.checkpoint, _ = ImportCheckpoint.objects.get_or_create(
+            source=source
+        )
+        self.users = {}
+        self.groups = {}
+        self.stats = Counter()
+        self.errors = []
+
+    @property
+    def position(self):
+        return self.checkpoint.position
+
+    @property
+    def first_post_id(self):
+        return self.checkpoint.first_post_id
+
+    def restart(self):
+        self.checkpoint.position = 0
+        self.checkpoint.first_post_id = None
+        self.checkpoint.save()
+
+    def resolve_users(self, names):
+        missing = set(names) - self.users.keys()
+        if not missing:
+            return
+        self.users.update(
+            User.objects.filter(username__in=missing)
+            .values_list('username', 'id')
+        )
+        new = missing - self.users.keys()
+        if new:
+            User.objects.bulk_create(
+                [User(username=name, password=make_password(None))
+                 for name in new],
+                ignore_conflicts=True,
+            )
+            self.users.update(
+                User.objects.filter(username__in=new)
+                .values_list('username', 'id')
+            )
+            self.stats['users'] += len(new)
+
+    def resolve_groups(self, slugs):
+        missing = set(slugs) - self.groups.keys()
+        if not missing:
+            return
+        self.groups.update(
+            Group.objects.filter(slug__in=missing).values_list('slug', 'id')
+        )
+        new = missing - self.groups.keys()
+        if new:
+            Group.objects.bulk_create(
+                [Group(slug=slug, title=slug, description='') for slug in new],
+                ignore_conflicts=True,
+            )
+            self.groups.update(
+                Group.objects.filter(slug__in=new).values_list('slug', 'id')
+            )
+            self.stats['groups'] += len(new)
+
+    def split(self, records):
+        """Раскладывает записи пачки по видам, отбрасывая неверные."""
+        kinds = {kind: [] for kind in KINDS}
+        for number, record in enumerate(records, self.position + 1):
+            if record is None:
+                continue
+            try:
+                kind = record.get('type')
+                if kind not in KINDS:
+                    raise RecordError(f'неизвестный тип {kind!r}')
+                kinds[kind].append(getattr(self, f'clean_{kind}')(record))
+            except (ValueError, AttributeError, TypeError) as error:
+                self.stats['skipped'] += 1
+                if len(self.errors) < MAX_ERRORS:
+                    self.errors.append(f'запись {number}: {error}')
+        return kinds
+
+    def clean_comment(self, record, nested=False):
+        comment = {
+            'author': username(record, 'author'),
+            'text': required(record, 'text'),
+            'created': parse_date(record.get('created')),
+        }
+        if not nested:
+            comment['post_id'] = int(required(record, 'post_id'))
+        return comment
+
+    def clean_post(self, record):
+        return {
+            'author': username(record, 'author'),
+            'text': required(record, 'text'),
+            'group': group_slug(record, 'group'),
+            'pub_date': parse_date(record.get('pub_date')),
+            'comments': [
+                self.clean_comment(comment, nested=True)
+                for comment in record.get('comments') or ()
+            ],
+        }
+
+    def clean_follow(self, record):
+        return {
+            'user': username(record, 'user'),
+            'author': username(record, 'author'),
+        }
+
+    def import_batch(self, records, size):
+        """Пишет пачку и сдвигает позицию источника на size записей."""
+        kinds = self.split(records)
+        with transaction.atomic():
+            # Транзакция SQLite отложенная: блокировку записи берёт первая
+            # запись. Берём её до next_id, иначе пост или комментарий из
+            # веб-запроса займёт тот же id раньше bulk_create
+            self.checkpoint.save(update_fields=['updated'])
+            self.resolve_users(
+                [post['author'] for post in kinds['post']]
+                + [comment['author'] for post in kinds['post']
+                   for comment in post['comments']]
+                + [comment['author'] for comment in kinds['comment']]
+                + [name for follow in kinds['follow']
+                   for name in (follow['user'], follow['author'])]
+            )
+            self.resolve_groups(
+                [post['group'] for post in kinds['post'] if post['group']]
+            )
+            comments = self.insert_posts(kinds['post'])
+            self.insert_comments(comments + self.existing(kinds['comment']))
+            self.insert_follows(kinds['follow'])
+            self.checkpoint.position += size
+            self.checkpoint.save()
+
+    def insert_posts(self, rows):
+        """Посты пачки с заранее назначенными id; вернёт их комментарии."""
+        if not rows:
+            return []
+        post_id = next_id(Post)
+        if self.checkpoint.first_post_id is None:
+            self.checkpoint.first_post_id = post_id
+        posts, dates, comments = [], [], []
+        for row in rows:
+            posts.append(Post(
+                id=post_id,
+                author_id=self.users[row['author']],
+                group_id=self.groups.get(row['group']),
+                text=row['text'],
+            ))
+            dates.append(row['pub_date'])
+            for comment in row['comments']:
+                comments.append(dict(comment, post_id=post_id))
+            post_id += 1
+        Post.objects.bulk_create(posts)
+        self.keep_dates(Post, posts, dates, 'pub_date')
+        self.stats['posts'] += len(posts)
+        return comments
+
+    def existing(self, comments):
+        """Комментарии к постам, которые есть в базе; прочие пропускаем."""
+        if not comments:
+            return []
+        post_ids = set(
+            Post.objects.filter(
+                id__in={comment['post_id'] for comment in comments}
+            ).values_list('id', flat=True)
+        )
+        valid = [comment for comment in comments
+                 if comment['post_id'] in post_ids]
+        self.stats['skipped'] += len(comments) - len(valid)
+        return valid
+
+    def insert_comments(self, rows):
+        if not rows:
+            return
+        first_id = next_id(Comment)
+        comments = Comment.objects.bulk_create([
+            Comment(
+                id=comment_id,
+                post_id=row['post_id'],
+                author_id=self.users[row['author']],
+                text=row['text'],
+            )
+            for comment_id, row in enumerate(rows, first_id)
+        ])
+        self.keep_dates(
+            Comment, comments, [row['created'] for row in rows], 'created'
+        )
+        self.stats['comments'] += len(comments)
+
+    def insert_follows(self, rows):
+        """Подписки без самоподписок и повторов, проверенные в памяти."""
+        if not rows:
+            return
+        pairs = {
+            (self.users[row['user']], self.users[row['author']])
+            for row in rows
+        }
+        self_follows = {pair for pair in pairs if pair[0] == pair[1]}
+        pairs -= self_follows
+        existing = set(
+            Follow.objects.filter(
+                user_id__in={user_id for user_id, _ in pairs}
+            ).values_list('user_id', 'author_id')
+        )
+        new = pairs - existing
+        Follow.objects.bulk_create(
+            [Follow(user_id=user_id, author_id=author_id)
+             for user_id, author_id in new],
+            ignore_conflicts=True,
+        )
+        self.stats['follows'] += len(new)
+        self.stats['skipped'] += len(rows) - len(new)
+
+    def keep_dates(self, model, objects, dates, field):
+        """Возвращает исходные даты, которые затёр auto_now_add."""
+        dated = []
+        for obj, date in zip(objects, dates):
+            if date is not None:
+                setattr(obj, field, date)
+                dated.append(obj)
+        if dated:
+            model.objects.bulk_update(dated, [field])
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import tags
+from posts.models import TagEntry
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет индекс хештегов и упоминаний по существующим постам, '
+        'читая их потоком пачками по --chunk-size.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Очистить индекс перед заполнением.',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            TagEntry.objects.all().delete()
+        started = time.perf_counter()
+        count = tags.backfill(options['chunk_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'Постов: {count}, записей индекса: {TagEntry.objects.count()}, '
+            f'{elapsed:.1f} с'
+        )
+        self.stdout.write(self.style.SUCCESS('Индекс меток заполнен'))
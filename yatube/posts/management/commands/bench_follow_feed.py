@@ -0,0 +1,49 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db.models import Count
+
+from posts import timeline
+from posts.feeds import follow_feed
+
+User = get_user_model()
+ENGINES = ('join', 'timeline', 'merge')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает движки ленты подписок на одних и тех же данных: '
+        'время сборки первой страницы для самых активных подписчиков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--skip-rebuild',
+            action='store_true',
+            help='Не пересобирать материализованные ленты перед замером.',
+        )
+
+    def handle(self, *args, **options):
+        if not options['skip_rebuild']:
+            timeline.rebuild()
+        users = list(
+            User.objects.annotate(follows=Count('follower'))
+            .order_by('-follows')[:options['users']]
+        )
+        if not users:
+            self.stdout.write('Нет пользователей для замера.')
+            return
+        for engine in ENGINES:
+            started = time.perf_counter()
+            for _ in range(options['repeat']):
+                for user in users:
+                    posts, _ = follow_feed(user, engine)
+                    list(Paginator(posts, settings.PAGE).page(1))
+            elapsed = time.perf_counter() - started
+            per_page = elapsed / (options['repeat'] * len(users)) * 1000
+            self.stdout.write(f'{engine:>8}: {per_page:.2f} мс на страницу')
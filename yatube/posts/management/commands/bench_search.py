@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.feeds import with_cards
+from posts.models import Post
+from posts.search import search_page
+
+DEFAULT_TERMS = ('тест', 'привет', 'django', 'кот')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск по индексу FTS5 с LIKE-сканированием '
+        '(text__icontains): время первой страницы результатов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('terms', nargs='*', default=DEFAULT_TERMS)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def measure(self, search, terms, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for term in terms:
+                list(search(term))
+        return (time.perf_counter() - started) / (repeat * len(terms)) * 1000
+
+    def handle(self, *args, **options):
+        terms, repeat = options['terms'], options['repeat']
+        posts = with_cards(Post.objects.all())
+        engines = {
+            'icontains': lambda term: posts.filter(
+                text__icontains=term
+            )[:settings.PAGE],
+            'fts5': lambda term: search_page(term, posts, settings.PAGE),
+        }
+        self.stdout.write(f'Постов: {Post.objects.count()}')
+        for name, search in engines.items():
+            per_query = self.measure(search, terms, repeat)
+            self.stdout.write(f'{name:>9}: {per_query:.2f} мс на запрос')
@@ -0,0 +1,53 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+from posts.models import Group, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты автора, группы или всего сайта в CSV или JSONL '
+        'потоком, с постоянным расходом памяти.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--author', help='Имя пользователя автора.')
+        parser.add_argument('--group', help='Слаг группы.')
+        parser.add_argument(
+            '--format', choices=sorted(export.FORMATS), default='jsonl'
+        )
+        parser.add_argument(
+            '--gzip', action='store_true', help='Сжимать в gzip на лету.'
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument(
+            '--output', '-o', help='Файл выгрузки; по умолчанию stdout.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            author = options['author'] and User.objects.get(
+                username=options['author']
+            )
+            group = options['group'] and Group.objects.get(
+                slug=options['group']
+            )
+        except (User.DoesNotExist, Group.DoesNotExist) as error:
+            raise CommandError(error)
+        chunks = export.stream(
+            export.posts_of(author or None, group or None),
+            options['format'],
+            options['gzip'],
+            options['chunk_size'],
+        )
+        if options['output']:
+            with open(options['output'], 'wb') as file:
+                for chunk in chunks:
+                    file.write(chunk)
+        else:
+            output = sys.stdout.buffer
+            for chunk in chunks:
+                output.write(chunk)
+            output.flush()
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт недостающие миниатюры из THUMBNAIL_RENDITIONS для '
+        'изображений всех постов.'
+    )
+
+    def handle(self, *args, **options):
+        names = (
+            Post.objects.exclude(image='')
+            .values_list('image', flat=True).order_by().distinct()
+        )
+        count = 0
+        for count, name in enumerate(names.iterator(), 1):
+            thumbnails.generate(name)
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано изображений: {count}')
+        )
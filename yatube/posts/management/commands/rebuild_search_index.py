@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает полнотекстовый индекс постов по таблице posts_post '
+        'и восстанавливает его триггеры.'
+    )
+
+    def handle(self, *args, **options):
+        search.install_triggers()
+        search.rebuild()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен'))
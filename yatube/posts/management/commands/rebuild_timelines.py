@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок пользователей с нуля.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--length',
+            type=int,
+            default=settings.TIMELINE_LENGTH,
+            help='Максимальная длина ленты одного пользователя.',
+        )
+
+    def handle(self, *args, **options):
+        users = timeline.rebuild(options['length'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересобрано лент: {users}')
+        )
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счётчики постов, комментариев '
+        'и подписок по фактическим данным.'
+    )
+
+    def handle(self, *args, **options):
+        updated = counters.recount()
+        for table, rows in updated.items():
+            self.stdout.write(f'{table}: обновлено строк {rows}')
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны'))
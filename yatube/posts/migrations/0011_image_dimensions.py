@@ -0,0 +1,36 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:24
+
+from django.db import migrations, models
+
+from posts.images import dimensions
+
+
+def fill_dimensions(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    for post in Post.objects.exclude(image='').only('image').iterator():
+        width, height = dimensions(post.image)
+        if width:
+            Post.objects.filter(pk=post.pk).update(
+                image_width=width, image_height=height,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_post_modified'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота картинки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина картинки'),
+        ),
+        migrations.RunPython(fill_dimensions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations
+
+from posts.search import CREATE_TABLE_SQL, DROP_SQL, REBUILD_SQL, TRIGGERS_SQL
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_image_dimensions'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [CREATE_TABLE_SQL, *TRIGGERS_SQL, REBUILD_SQL], DROP_SQL
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('tag', 'Хештег'), ('user', 'Упоминание')], max_length=4, verbose_name='Вид')),
+                ('name', models.CharField(max_length=150, verbose_name='Метка')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_entries', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Запись индекса меток',
+                'verbose_name_plural': 'Записи индекса меток',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='tagentry',
+            index=models.Index(fields=['kind', 'name', '-pub_date', '-post'], name='tag_name_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='tagentry',
+            constraint=models.UniqueConstraint(fields=('post', 'kind', 'name'), name='Ограничение на повтор метки поста'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_tag_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255, unique=True, verbose_name='Источник')),
+                ('position', models.PositiveIntegerField(default=0, verbose_name='Обработано записей')),
+                ('first_post_id', models.PositiveIntegerField(blank=True, null=True, verbose_name='Первый пост импорта')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name': 'Позиция импорта',
+                'verbose_name_plural': 'Позиции импорта',
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_created(apps, schema_editor):
+    # Старым комментариям без даты ставим дату поста: курсор по
+    # (created, id) не умеет сравнивать с NULL
+    Comment = apps.get_model('posts', 'Comment')
+    Post = apps.get_model('posts', 'Post')
+    Comment.objects.filter(created__isnull=True).update(
+        created=Subquery(
+            Post.objects.filter(pk=OuterRef('post_id')).values('pub_date')
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_import_checkpoint'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_created, migrations.RunPython.noop),
+        migrations.AlterModelOptions(
+            name='comment',
+            options={'ordering': ['created', 'id'], 'verbose_name': 'Комментарий', 'verbose_name_plural': 'Комментарии'},
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Дата комментария'),
+        ),
+    ]
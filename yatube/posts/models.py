@@ -8,6 +8,11 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField(max_length=500)
+    posts_count = models.PositiveIntegerField(
+        'Число постов',
+        default=0,
+        editable=False
+    )
 
     def __str__(self):
         return self.title
@@ -22,6 +27,10 @@ class Post(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    modified = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -42,14 +51,45 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    # Размеры заполняет сигнал pre_save при смене картинки, чтобы шаблоны
+    # выводили width и height у <img>, не открывая файл
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
+    )
 
     def __str__(self):
         return self.text
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # Каждая лента — диапазон одного из этих индексов в порядке выдачи
+        indexes = [
+            models.Index(name='post_date_idx', fields=['-pub_date', '-id']),
+            models.Index(
+                name='post_author_date_idx',
+                fields=['author', '-pub_date', '-id'],
+            ),
+            models.Index(
+                name='post_group_date_idx',
+                fields=['group', '-pub_date', '-id'],
+            ),
+        ]
 
 
 class Comment(models.Model):
@@ -67,11 +107,18 @@ class Comment(models.Model):
         'Текст комментария',
         help_text='Введите текст комментария'
     )
-    created = models.DateTimeField(auto_now_add=True, null=True)
+    created = models.DateTimeField('Дата комментария', auto_now_add=True)
 
     class Meta:
+        ordering = ['created', 'id']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                name='comment_post_created_idx',
+                fields=['post', 'created', 'id'],
+            ),
+        ]
 
     def __str__(self):
         return '{}'.format(self.user)
@@ -94,6 +141,13 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+        # (user, author) покрыт уникальным ограничением ниже
+        indexes = [
+            models.Index(
+                name='follow_author_user_idx',
+                fields=['author', 'user'],
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 name='Ограничение на единственную связь',
@@ -104,3 +158,125 @@ class Follow(models.Model):
                 check=~models.Q(author=models.F('user')),
             ),
         ]
+
+
+class AuthorStats(models.Model):
+    """Счётчики пользователя, которые иначе пришлось бы агрегировать."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0
+    )
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self):
+        return str(self.user)
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи ленты подписок'
+        indexes = [
+            models.Index(
+                name='timeline_user_date_idx',
+                fields=['user', '-pub_date', '-post'],
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                name='Ограничение на повтор поста в ленте',
+                fields=['user', 'post'],
+            ),
+        ]
+
+
+class TagEntry(models.Model):
+    """Запись обратного индекса: хештег или упоминание → пост."""
+    HASHTAG = 'tag'
+    MENTION = 'user'
+    KINDS = (
+        (HASHTAG, 'Хештег'),
+        (MENTION, 'Упоминание'),
+    )
+    kind = models.CharField('Вид', max_length=4, choices=KINDS)
+    name = models.CharField('Метка', max_length=150)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='tag_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись индекса меток'
+        verbose_name_plural = 'Записи индекса меток'
+        # Лента метки — диапазон индекса в порядке выдачи; ограничение
+        # уникальности заодно ищет метки поста при правке
+        indexes = [
+            models.Index(
+                name='tag_name_date_idx',
+                fields=['kind', 'name', '-pub_date', '-post'],
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                name='Ограничение на повтор метки поста',
+                fields=['post', 'kind', 'name'],
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}:{self.name}'
+
+
+class ImportCheckpoint(models.Model):
+    """Сколько записей источника уже импортировано (import_content).
+
+    Обновляется в одной транзакции с пачкой записей, поэтому после
+    прерывания импорт продолжается ровно с первой незаписанной.
+    """
+    source = models.CharField('Источник', max_length=255, unique=True)
+    position = models.PositiveIntegerField('Обработано записей', default=0)
+    # С этого id начинаются посты импорта: по ним после завершения
+    # строится индекс меток, в том числе после продолжения
+    first_post_id = models.PositiveIntegerField(
+        'Первый пост импорта',
+        null=True,
+        blank=True
+    )
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Позиция импорта'
+        verbose_name_plural = 'Позиции импорта'
+
+    def __str__(self):
+        return f'{self.source}: {self.position}'
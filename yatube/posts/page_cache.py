@@ -0,0 +1,82 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date
+
+from .generations import current, generation_key, last_modified
+from .models import Group, Post, User
+
+
+def cache_anonymous_page(get_keys):
+    """Кеширует страницу для анонимов целиком и отвечает 304 по валидаторам.
+
+    get_keys(request, **kwargs) возвращает ключи поколений, от которых
+    зависит страница, или None, если кешировать нельзя (например, объекта
+    нет и view ответит 404). ETag строится из адреса и поколений, поэтому
+    сигналы моделей сбрасывают и кеш, и валидаторы.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (
+                request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated
+            ):
+                return view(request, *args, **kwargs)
+            keys = get_keys(request, **kwargs)
+            if not keys:
+                return view(request, *args, **kwargs)
+            version = '{}|{}'.format(request.get_full_path(), current(*keys))
+            etag = '"{}"'.format(hashlib.md5(version.encode()).hexdigest())
+            modified = last_modified(*keys)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=modified
+            )
+            if response is not None:
+                return response
+            page_key = f'anonymous_page:{etag}'
+            response = cache.get(page_key)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200 or response.cookies:
+                    return response
+                response['ETag'] = etag
+                response['Last-Modified'] = http_date(modified)
+                patch_cache_control(response, public=True, max_age=0)
+                patch_vary_headers(response, ('Cookie',))
+                cache.set(page_key, response, settings.PAGE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
+
+
+def index_keys(request):
+    return [generation_key('index')]
+
+
+def group_keys(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    return group_id and [generation_key('group', group_id)]
+
+
+def profile_keys(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    return author_id and [generation_key('author', author_id)]
+
+
+def post_keys(request, post_id):
+    author_id = Post.objects.filter(pk=post_id).values_list(
+        'author_id', flat=True
+    ).first()
+    return author_id and [
+        generation_key('post', post_id),
+        generation_key('author', author_id),
+    ]
@@ -0,0 +1,207 @@
+import base64
+import json
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from core.stampede import remember
+
+
+def encode_cursor(direction, values):
+    """Упаковывает направление и значения ключа в непрозрачный токен."""
+    raw = json.dumps(
+        [direction, *values],
+        default=lambda value: value.isoformat(),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен; для пустого или битого токена вернёт None.
+
+    Значения ключа — только строки и числа: вложенные объекты и null
+    в запрос не передаются.
+    """
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, *values = json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+    if direction not in ('next', 'prev') or not values:
+        return None
+    if not all(
+        isinstance(value, (str, int, float)) and not isinstance(value, bool)
+        for value in values
+    ):
+        return None
+    return direction, values
+
+
+class FeedPaginator(Paginator):
+    """Paginator с кешированным числом записей и окном номеров страниц.
+
+    Число записей ленты хранится в кеше под count_key и сбрасывается
+    сигналами при появлении и удалении постов, поэтому COUNT(*) не
+    выполняется на каждый запрос, а после сброса его считает один
+    процесс, а не все сразу.
+    """
+
+    def __init__(self, object_list, per_page, count_key=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return Paginator.count.func(self)
+        return remember(
+            self.count_key,
+            lambda: Paginator.count.func(self),
+            settings.FEED_COUNT_TIMEOUT,
+        )
+
+    def page_window(self, number, on_each_side=2, on_ends=1):
+        """Номера страниц вокруг текущей и по краям; None — многоточие."""
+        last = self.num_pages
+        pages = set(range(1, min(on_ends, last) + 1))
+        pages.update(range(max(last - on_ends + 1, 1), last + 1))
+        pages.update(range(
+            max(number - on_each_side, 1),
+            min(number + on_each_side, last) + 1,
+        ))
+        window = []
+        previous = 0
+        for page in sorted(pages):
+            if page - previous == 2:
+                window.append(previous + 1)
+            elif page - previous > 2:
+                window.append(None)
+            window.append(page)
+            previous = page
+        return window
+
+    def _get_page(self, *args, **kwargs):
+        page = super()._get_page(*args, **kwargs)
+        page.window = self.page_window(page.number)
+        return page
+
+
+class CursorPage(Sequence):
+    """Страница курсорной навигации с интерфейсом, похожим на Page."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, number, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.number = number
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<CursorPage {}>'.format(self.number or 'first')
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+
+class CursorPaginator:
+    """Постраничная навигация по ключу (keyset) без COUNT и OFFSET.
+
+    Страница выбирается диапазонным поиском по индексу: берём на одну
+    запись больше размера страницы, чтобы узнать, есть ли следующая.
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = [
+            (name.lstrip('-'), name.startswith('-')) for name in ordering
+        ]
+
+    def keys(self, obj):
+        return [getattr(obj, name) for name, _ in self.ordering]
+
+    def order_by(self, backwards=False):
+        return [
+            '-' + name if descending != backwards else name
+            for name, descending in self.ordering
+        ]
+
+    def seek(self, values, backwards=False):
+        """Условие «строго после ключа» в выбранном направлении.
+
+        Первое поле вынесено в отдельное нестрогое сравнение, чтобы
+        СУБД могла начать поиск по индексу, а не перебирать OR-ветки.
+        """
+        lookups = [
+            (name, 'lt' if descending != backwards else 'gt')
+            for name, descending in self.ordering
+        ]
+        condition = Q()
+        equal = {}
+        for (name, op), value in zip(lookups, values):
+            condition |= Q(**equal, **{f'{name}__{op}': value})
+            equal[name] = value
+        first, first_op = lookups[0]
+        return Q(**{f'{first}__{first_op}e': values[0]}) & condition
+
+    def fetch(self, position):
+        queryset = self.object_list
+        backwards = position is not None and position[0] == 'prev'
+        if position is not None:
+            queryset = queryset.filter(self.seek(position[1], backwards))
+        return list(
+            queryset.order_by(*self.order_by(backwards))[:self.per_page + 1]
+        )
+
+    def get_page(self, cursor):
+        """Возвращает страницу после (или до) курсора.
+
+        Как и Paginator.get_page, на неверный курсор отвечает первой
+        страницей, а не ошибкой.
+        """
+        position = decode_cursor(cursor)
+        if position is not None and len(position[1]) != len(self.ordering):
+            position = None
+        try:
+            rows = self.fetch(position)
+        except (ValidationError, TypeError, ValueError, OverflowError):
+            # OverflowError — число вне диапазона INTEGER базы
+            position = None
+            rows = self.fetch(position)
+        backwards = position is not None and position[0] == 'prev'
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or backwards:
+                next_cursor = encode_cursor('next', self.keys(rows[-1]))
+            if position is not None and (has_more or not backwards):
+                previous_cursor = encode_cursor('prev', self.keys(rows[0]))
+        return CursorPage(
+            rows,
+            number=cursor or '',
+            next_cursor=next_cursor,
+            previous_cursor=previous_cursor,
+        )
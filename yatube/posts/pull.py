@@ -0,0 +1,116 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .follows import following_ids
+from .models import Post
+
+AUTHOR_POSTS_KEY = 'author_posts:{}'
+AUTHOR_POSTS_TIMEOUT = 60 * 60 * 24
+RECENT_SQL = '''
+    SELECT author_id, pub_date, id FROM ({}) AS ranked
+    WHERE position <= %s
+    ORDER BY author_id, pub_date DESC, id DESC
+'''
+
+
+def author_key(author_id):
+    return AUTHOR_POSTS_KEY.format(author_id)
+
+
+def load_author_posts(author_ids):
+    """Последние посты авторов одним запросом: {id автора: [(timestamp,
+    id), ...] по убыванию}.
+
+    ROW_NUMBER() нумерует посты внутри автора, внешний запрос оставляет
+    по TIMELINE_LENGTH с каждого — вместо запроса на каждого автора.
+    """
+    lists = {author_id: [] for author_id in author_ids}
+    if not lists:
+        return lists
+    ranked = Post.objects.filter(author_id__in=lists).annotate(
+        position=Window(
+            RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=[F('pub_date').desc(), F('id').desc()],
+        )
+    ).order_by().values_list('author_id', 'pub_date', 'id', 'position')
+    sql, params = ranked.query.sql_with_params()
+    field = Post._meta.get_field('pub_date')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            RECENT_SQL.format(sql), (*params, settings.TIMELINE_LENGTH)
+        )
+        for author_id, pub_date, post_id in cursor.fetchall():
+            pub_date = connection.ops.convert_datetimefield_value(
+                pub_date, field, connection
+            )
+            lists[author_id].append((pub_date.timestamp(), post_id))
+    return lists
+
+
+def author_posts_many(author_ids):
+    """Списки постов авторов: одним get_many, промахи — одним запросом."""
+    keys = {author_key(author_id): author_id for author_id in author_ids}
+    found = cache.get_many(keys)
+    missing = [
+        author_id for key, author_id in keys.items() if key not in found
+    ]
+    if missing:
+        loaded = {
+            author_key(author_id): entries
+            for author_id, entries in load_author_posts(missing).items()
+        }
+        cache.set_many(loaded, AUTHOR_POSTS_TIMEOUT)
+        found.update(loaded)
+    return list(found.values())
+
+
+def forget(author_id):
+    """Сбрасывает закешированный список автора после записи поста.
+
+    Ключ удаляется сразу и ещё раз после фиксации транзакции, как
+    в follows.forget: правка списка через get/set не атомарна, и
+    запрос, прочитавший посты до коммита, вернул бы старый список.
+    Следующее чтение загрузит список заново одним запросом.
+    """
+    key = author_key(author_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def merged_ids(user, limit=None):
+    """id постов ленты подписок: k-путевое слияние списков авторов."""
+    limit = limit or settings.TIMELINE_LENGTH
+    lists = author_posts_many(list(following_ids(user)))
+    merged = heapq.merge(*lists, reverse=True)
+    return [post_id for _, post_id in islice(merged, limit)]
+
+
+class MergedFeed:
+    """Лента из готового списка id; посты догружаются постранично.
+
+    Paginator берёт срез, и на каждую страницу уходит один запрос
+    id__in, а порядок восстанавливается по списку.
+    """
+
+    def __init__(self, ids, queryset=None):
+        self.ids = ids
+        self.queryset = queryset if queryset is not None else (
+            Post.objects.all()
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        ids = self.ids[index]
+        posts = self.queryset.in_bulk(ids)
+        return [posts[post_id] for post_id in ids if post_id in posts]
@@ -0,0 +1,186 @@
+import math
+import re
+
+from django.db import connection, connections
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .paginators import CursorPage, decode_cursor, encode_cursor
+
+TABLE = 'posts_post_fts'
+# Индекс FTS5 с внешним содержимым: сам текст хранится только
+# в posts_post, а триггеры поддерживают индекс при любой записи,
+# включая bulk_create и update() мимо сигналов
+CREATE_TABLE_SQL = f'''
+    CREATE VIRTUAL TABLE {TABLE} USING fts5(
+        text,
+        content='posts_post',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+'''
+TRIGGERS_SQL = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {TABLE}_insert AFTER INSERT ON posts_post
+    BEGIN
+        INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {TABLE}_delete AFTER DELETE ON posts_post
+    BEGIN
+        INSERT INTO {TABLE}({TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {TABLE}_update
+    AFTER UPDATE OF text ON posts_post
+    BEGIN
+        INSERT INTO {TABLE}({TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text);
+    END
+    ''',
+]
+REBUILD_SQL = f"INSERT INTO {TABLE}({TABLE}) VALUES ('rebuild')"
+OPTIMIZE_SQL = f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')"
+DROP_SQL = [
+    f'DROP TRIGGER IF EXISTS {TABLE}_update',
+    f'DROP TRIGGER IF EXISTS {TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {TABLE}_insert',
+    f'DROP TABLE IF EXISTS {TABLE}',
+]
+TERM_RE = re.compile(r'\w+')
+# Границы совпадения в snippet(): символы, которых нет в тексте после
+# экранирования, — их заменяем на <mark> уже в безопасном HTML
+MARK_START, MARK_END = '\x02', '\x03'
+SNIPPET_TOKENS = 32
+
+SEARCH_SQL = f'''
+    SELECT rowid, rank,
+           snippet({TABLE}, 0, '{MARK_START}', '{MARK_END}', '…', %s)
+    FROM {TABLE}
+    WHERE {TABLE} MATCH %s {{after}}
+    ORDER BY rank, rowid
+    LIMIT %s
+'''
+AFTER_SQL = 'AND (rank > %s OR (rank = %s AND rowid > %s))'
+
+
+def fts_query(text):
+    """Запрос FTS5 из пользовательской строки: слова через AND.
+
+    Каждое слово берётся в кавычки, так что операторы FTS5 и кавычки
+    из ввода ничего не ломают, а * ищет по префиксу — без стемминга
+    это находит и другие формы русских слов.
+    """
+    terms = TERM_RE.findall(text.lower())
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def highlight(snippet):
+    """Экранирует фрагмент текста и выделяет совпадения тегом <mark>."""
+    html = escape(snippet)
+    html = html.replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+    return mark_safe(html)
+
+
+def matching_ids(text):
+    """Подзапрос с id постов, подходящих под запрос, — для filter()."""
+    return RawSQL(
+        f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s',
+        (fts_query(text),),
+    )
+
+
+def search_position(cursor):
+    """(rank, id) из курсора поиска или None для первой страницы.
+
+    rank — конечное число, id — целое в пределах INTEGER SQLite;
+    всё остальное в запрос не попадает.
+    """
+    position = decode_cursor(cursor)
+    if position is None or position[0] != 'next' or len(position[1]) != 2:
+        return None
+    rank, post_id = position[1]
+    if not isinstance(rank, (int, float)) or not math.isfinite(rank):
+        return None
+    if not isinstance(post_id, int) or not -2 ** 63 <= post_id < 2 ** 63:
+        return None
+    return float(rank), post_id
+
+
+def search_page(text, queryset, per_page, cursor=None):
+    """Страница результатов по релевантности (bm25) с курсором.
+
+    Курсор — пара (rank, id) последнего результата, следующая страница
+    продолжает поиск строго после неё без OFFSET. Посты загружаются
+    из queryset одним запросом, к каждому добавляется post.snippet.
+    """
+    query = fts_query(text)
+    if not query:
+        return CursorPage([], number='')
+    position = search_position(cursor)
+    params = [SNIPPET_TOKENS, query]
+    after = ''
+    if position is not None:
+        rank, post_id = position
+        after = AFTER_SQL
+        params.extend([rank, rank, post_id])
+    params.append(per_page + 1)
+    with connection.cursor() as db:
+        db.execute(SEARCH_SQL.format(after=after), params)
+        rows = db.fetchall()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    posts = queryset.in_bulk([post_id for post_id, _, _ in rows])
+    results = []
+    for post_id, _, snippet in rows:
+        post = posts.get(post_id)
+        if post is not None:
+            post.snippet = highlight(snippet)
+            results.append(post)
+    next_cursor = None
+    if has_more:
+        post_id, rank, _ = rows[-1]
+        next_cursor = encode_cursor('next', [rank, post_id])
+    return CursorPage(results, number=cursor or '', next_cursor=next_cursor)
+
+
+def install_triggers(using='default'):
+    """Восстанавливает триггеры, если миграция пересоздала posts_post.
+
+    SQLite меняет схему таблицы, копируя её в новую, и триггеры старой
+    таблицы пропадают; индекс после этого нужно перестроить.
+    """
+    db_connection = connections[using]
+    if TABLE not in db_connection.introspection.table_names():
+        return False
+    with db_connection.cursor() as db:
+        db.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' "
+            "AND tbl_name = 'posts_post' AND name LIKE %s",
+            [f'{TABLE}_%'],
+        )
+        if db.fetchone()[0] == len(TRIGGERS_SQL):
+            return False
+        for sql in TRIGGERS_SQL:
+            db.execute(sql)
+        db.execute(REBUILD_SQL)
+    return True
+
+
+def optimize():
+    """Сливает сегменты индекса в один — после массовой вставки."""
+    with connection.cursor() as db:
+        db.execute(OPTIMIZE_SQL)
+
+
+def rebuild():
+    """Перестраивает индекс по posts_post и сжимает его сегменты."""
+    with connection.cursor() as db:
+        db.execute(REBUILD_SQL)
+    optimize()
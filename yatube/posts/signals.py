@@ -0,0 +1,178 @@
+from django.conf import settings
+from django.db.models.signals import (post_delete, post_init, post_migrate,
+                                      post_save, pre_save)
+from django.dispatch import receiver
+
+from . import (autocomplete, counters, follows, generations, pull, search,
+               tags, thumbnails, timeline)
+from .feeds import count_key, forget_count_keys, forget_counts
+from .images import dimensions
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+
+def timeline_enabled():
+    return settings.FOLLOW_FEED_ENGINE == 'timeline'
+
+
+@receiver(post_migrate)
+def migrated(sender, using, **kwargs):
+    if sender.name == 'posts':
+        search.install_triggers(using)
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.objects.get_or_create(user=instance)
+        # id мог достаться от удалённого пользователя вместе с его кешем
+        forget_count_keys(
+            count_key('author', instance.pk), count_key('follow', instance.pk)
+        )
+        follows.forget(instance.pk)
+
+
+@receiver(post_init, sender=User)
+def user_loaded(sender, instance, **kwargs):
+    instance._names = user_names(instance)
+
+
+def user_names(user):
+    return tuple(
+        user.__dict__.get(field) for field in autocomplete.USER_FIELDS
+    )
+
+
+@receiver(post_save, sender=User)
+def user_renamed(sender, instance, created, update_fields=None, **kwargs):
+    # Вход в систему сохраняет только last_login — имена не менялись
+    if update_fields and not set(update_fields) & set(
+        autocomplete.USER_FIELDS
+    ):
+        return
+    autocomplete.update_user(instance)
+    names, instance._names = instance._names, user_names(instance)
+    if created or names == instance._names:
+        return
+    # Имя автора видно в карточках его постов и на всех страницах с ними
+    group_ids = Post.objects.filter(author=instance).exclude(
+        group=None
+    ).order_by().values_list('group_id', flat=True).distinct()
+    generations.bump(
+        generations.generation_key('user', instance.pk),
+        generations.generation_key('index'),
+        generations.generation_key('author', instance.pk),
+        *(generations.generation_key('group', pk) for pk in group_ids),
+    )
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    autocomplete.remove(('user', instance.pk))
+
+
+@receiver(post_save, sender=Group)
+def group_created(sender, instance, created, **kwargs):
+    # Название и описание видны на странице группы; новый id мог
+    # достаться от удалённой группы вместе с её кешем
+    generations.bump(generations.generation_key('group', instance.pk))
+    if created:
+        forget_count_keys(count_key('group', instance.pk))
+    autocomplete.update_group(instance)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    generations.bump(generations.generation_key('group', instance.pk))
+    autocomplete.remove(('group', instance.pk))
+
+
+@receiver(post_init, sender=Post)
+def post_loaded(sender, instance, **kwargs):
+    # Запоминаем группу, с которой пост был посчитан; берём из __dict__,
+    # чтобы не догружать отложенное (only/defer) поле отдельным запросом.
+    instance._counted_group_id = instance.__dict__.get('group_id')
+    image = instance.__dict__.get('image')
+    instance._image_name = getattr(image, 'name', image)
+    instance._indexed_text = instance.__dict__.get('text')
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    # Размеры читаем один раз при смене картинки, а не при каждом показе
+    if not instance.image:
+        instance.image_width = instance.image_height = None
+    elif (not instance.image._committed
+          or instance.image.name != instance._image_name):
+        instance.image_width, instance.image_height = dimensions(
+            instance.image
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    generations.bump(
+        *generations.post_keys(instance, instance._counted_group_id)
+    )
+    if created:
+        counters.post_added(instance)
+        # Подписчики нужны и размерам лент, и fan-out: читаем их один раз
+        followers = follows.follower_ids(instance.author_id)
+        forget_counts(instance, followers=followers)
+        pull.forget(instance.author_id)
+        if timeline_enabled():
+            timeline.fan_out(instance, followers)
+    elif instance._counted_group_id != instance.group_id:
+        counters.post_regrouped(instance._counted_group_id, instance.group_id)
+        forget_counts(instance, instance._counted_group_id)
+    instance._counted_group_id = instance.group_id
+    if created or instance.text != instance._indexed_text:
+        tags.index_post(instance, created)
+        instance._indexed_text = instance.text
+    if instance.image and instance.image.name != instance._image_name:
+        # Миниатюры готовятся в фоне, а не при первом показе страницы
+        thumbnails.schedule(instance.image.name)
+    if not created and instance.image.name != instance._image_name:
+        thumbnails.discard(instance._image_name)
+    instance._image_name = instance.image.name
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    generations.bump(*generations.post_keys(instance))
+    counters.post_removed(instance)
+    forget_counts(instance)
+    pull.forget(instance.author_id)
+    thumbnails.discard(instance._image_name)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    generations.bump(generations.generation_key('post', instance.post_id))
+    if created:
+        counters.comment_added(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    generations.bump(generations.generation_key('post', instance.post_id))
+    counters.comment_removed(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if not created:
+        return
+    counters.follow_added(instance)
+    follows.forget(instance.user_id)
+    forget_count_keys(count_key('follow', instance.user_id))
+    if timeline_enabled():
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.follow_removed(instance)
+    follows.forget(instance.user_id)
+    forget_count_keys(count_key('follow', instance.user_id))
+    if timeline_enabled():
+        timeline.remove(instance.user_id, instance.author_id)
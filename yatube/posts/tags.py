@@ -0,0 +1,89 @@
+import re
+from functools import reduce
+from operator import or_
+
+from django.db.models import F, Q
+
+from .models import Post, TagEntry
+
+FEED_ORDERING = ('-feed_date', '-feed_post')
+# &#x27; в экранированном тексте — не хештег (см. post_text.link_labels)
+HASHTAG_RE = re.compile(r'(?<![\w&#;])#(\w{1,100})')
+# Символы имени пользователя Django; точка в конце — это конец фразы
+MENTION_RE = re.compile(r'(?<![\w@.])@([\w.+-]{1,150})')
+
+
+def extract(text):
+    """Множество меток текста: (TagEntry.HASHTAG | MENTION, имя).
+
+    Хештеги сравниваются без учёта регистра, имена пользователей —
+    как в модели User, с учётом.
+    """
+    labels = {
+        (TagEntry.HASHTAG, name.lower()) for name in HASHTAG_RE.findall(text)
+    }
+    for name in MENTION_RE.findall(text):
+        name = name.rstrip('.')
+        if name:
+            labels.add((TagEntry.MENTION, name))
+    return labels
+
+
+def entries(post, labels):
+    return [
+        TagEntry(kind=kind, name=name, post=post, pub_date=post.pub_date)
+        for kind, name in labels
+    ]
+
+
+def index_post(post, created=False):
+    """Приводит записи индекса поста к меткам его текущего текста.
+
+    При правке записи исчезнувших меток удаляются одним запросом,
+    а текущие вставляются заново: уже проиндексированные пропустит
+    ignore_conflicts, и их id не меняются. Без чтения старых записей
+    правка обходится двумя запросами.
+    """
+    labels = extract(post.text)
+    if not created:
+        stale = post.tag_entries.all()
+        if labels:
+            stale = stale.exclude(reduce(or_, (
+                Q(kind=kind, name=name) for kind, name in labels
+            )))
+        stale.delete()
+    if labels:
+        TagEntry.objects.bulk_create(
+            entries(post, labels), ignore_conflicts=True
+        )
+
+
+def backfill(chunk_size=1000, posts=None):
+    """Индексирует посты потоком по chunk_size, возвращает их число.
+
+    Посты читаются итератором без загрузки всей таблицы, записи
+    индекса вставляются пачкой на каждый chunk.
+    """
+    posts = Post.objects.all() if posts is None else posts
+    batch = []
+    count = 0
+    for post in posts.only('text', 'pub_date').order_by().iterator(
+        chunk_size=chunk_size
+    ):
+        count += 1
+        batch.extend(entries(post, extract(post.text)))
+        if count % chunk_size == 0:
+            TagEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    TagEntry.objects.bulk_create(batch, ignore_conflicts=True)
+    return count
+
+
+def feed(kind, name):
+    """Посты метки: диапазонное чтение индекса по (kind, name, pub_date)."""
+    return Post.objects.filter(
+        tag_entries__kind=kind, tag_entries__name=name
+    ).annotate(
+        feed_date=F('tag_entries__pub_date'),
+        feed_post=F('tag_entries__post'),
+    ).order_by(*FEED_ORDERING)
@@ -0,0 +1,51 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from ..generations import current_many, generation_key
+from ..thumbnails import prefetch
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/type.html'
+
+
+def card_key(post, author_version):
+    """Ключ карточки меняется вместе с постом и с именем его автора."""
+    return 'post_card:{}:{}:{}'.format(
+        post.pk, int(post.modified.timestamp() * 1000000), author_version
+    )
+
+
+@register.simple_tag
+def post_cards(posts):
+    """Карточки постов страницы: один get_many, рендер только промахов.
+
+    Возвращает пары (пост, html карточки), общие для всех лент.
+    """
+    posts = list(posts)
+    versions = current_many(list({
+        generation_key('user', post.author_id) for post in posts
+    }))
+    keys = [
+        card_key(post, versions[generation_key('user', post.author_id)])
+        for post in posts
+    ]
+    cards = cache.get_many(keys)
+    misses = [
+        (key, post) for key, post in zip(keys, posts) if key not in cards
+    ]
+    # Миниатюры всех карточек к рендеру — одним обращением к хранилищу
+    renditions = prefetch([post.image for _, post in misses])
+    missing = {
+        key: render_to_string(
+            CARD_TEMPLATE, {'post': post, 'renditions': renditions}
+        )
+        for key, post in misses
+    }
+    if missing:
+        cache.set_many(missing, settings.CARD_CACHE_TIMEOUT)
+        cards.update(missing)
+    return [(post, mark_safe(cards[key])) for key, post in zip(keys, posts)]
@@ -0,0 +1,39 @@
+from django import template
+from django.urls import reverse
+from django.utils.html import conditional_escape, format_html
+from django.utils.safestring import mark_safe
+
+from ..tags import HASHTAG_RE, MENTION_RE
+
+register = template.Library()
+
+
+def hashtag_link(match):
+    name = match.group(1)
+    return format_html(
+        '<a href="{}">#{}</a>', reverse('posts:tag', args=(name.lower(),)),
+        name,
+    )
+
+
+def mention_link(match):
+    name = match.group(1).rstrip('.')
+    if not name:
+        return match.group(0)
+    return format_html(
+        '<a href="{}">@{}</a>{}', reverse('posts:profile', args=(name,)),
+        name, match.group(1)[len(name):],
+    )
+
+
+@register.filter(needs_autoescape=True)
+def link_labels(text, autoescape=True):
+    """Хештеги — ссылки на ленты тегов, @имена — на профили.
+
+    Регулярные выражения те же, что у индекса меток, и работают уже
+    по экранированному тексту: &#x27; и подобные не примут за хештег.
+    """
+    html = conditional_escape(text) if autoescape else text
+    html = HASHTAG_RE.sub(hashtag_link, html)
+    html = MENTION_RE.sub(mention_link, html)
+    return mark_safe(html)
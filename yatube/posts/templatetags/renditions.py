@@ -0,0 +1,99 @@
+from django import template
+from django.conf import settings
+from django.db.models.fields.files import FieldFile
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from ..thumbnails import prefetch, variant_formats, variant_name
+
+register = template.Library()
+
+
+def intrinsic_size(image):
+    """Размеры оригинала из полей модели, без открытия файла."""
+    name = image.field.name
+    return (
+        getattr(image.instance, f'{name}_width', None),
+        getattr(image.instance, f'{name}_height', None),
+    )
+
+
+def ready(prefetched, image, names):
+    """Готовые миниатюры из names; ещё не созданные пропускаются."""
+    result = {}
+    for name in names:
+        thumbnail = prefetched[image.name, name]
+        if not isinstance(thumbnail, FieldFile):
+            result[name] = thumbnail
+    return result
+
+
+def srcset_value(thumbnails):
+    # Миниатюры в наборе идут по возрастанию; нерастянутая большая из
+    # маленького оригинала окажется не шире предыдущей и не нужна
+    candidates = []
+    for thumbnail in thumbnails:
+        if not candidates or thumbnail.width > candidates[-1].width:
+            candidates.append(thumbnail)
+    return ', '.join(
+        f'{thumbnail.url} {thumbnail.width}w' for thumbnail in candidates
+    )
+
+
+@register.simple_tag(takes_context=True)
+def responsive_image(context, image, srcset='card', css_class='', alt=''):
+    """<img> с srcset из готовых миниатюр набора IMAGE_SRCSETS[srcset].
+
+    width и height берутся из хранилища sorl или из полей модели, так
+    что файл при рендере не открывается. Пока миниатюр нет, выводится
+    оригинал. Готовые копии в форматах IMAGE_VARIANTS добавляются
+    в <picture> как <source>, браузер выберет первый знакомый формат.
+    """
+    config = settings.IMAGE_SRCSETS[srcset]
+    names = config['renditions']
+    formats = variant_formats()
+    wanted = list(names) + [
+        variant_name(name, image_format)
+        for image_format in formats for name in names
+    ]
+    prefetched = context.get('renditions') or {}
+    if any((image.name, name) not in prefetched for name in wanted):
+        prefetched = prefetch([image], wanted)
+    main_set = ready(prefetched, image, names)
+    attrs = {'class': css_class or None}
+    sources = []
+    if main_set:
+        main = main_set.get(config['default']) or next(
+            iter(main_set.values())
+        )
+        attrs.update({
+            'src': main.url,
+            'srcset': srcset_value(main_set.values()),
+            'sizes': config['sizes'],
+            'width': main.width,
+            'height': main.height,
+        })
+        for image_format in formats:
+            variants = ready(prefetched, image, [
+                variant_name(name, image_format) for name in names
+            ])
+            if variants:
+                sources.append(format_html(
+                    '<source type="image/{}" srcset="{}" sizes="{}">',
+                    image_format.lower(),
+                    srcset_value(variants.values()),
+                    config['sizes'],
+                ))
+    else:
+        width, height = intrinsic_size(image)
+        attrs.update({'src': image.url, 'width': width, 'height': height})
+    attrs.update({'alt': alt, 'loading': 'lazy', 'decoding': 'async'})
+    img = format_html('<img {}>', format_html_join(
+        ' ', '{}="{}"',
+        ((key, value) for key, value in attrs.items() if value is not None),
+    ))
+    if not sources:
+        return img
+    return format_html(
+        '<picture>{}{}</picture>', mark_safe(''.join(sources)), img
+    )
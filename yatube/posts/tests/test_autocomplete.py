@@ -0,0 +1,99 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from .. import autocomplete
+from ..autocomplete import PrefixIndex, process_index
+from ..models import Group
+
+User = get_user_model()
+AUTOCOMPLETE = reverse('posts:autocomplete')
+
+
+def run_on_commit():
+    # TestCase не фиксирует транзакцию, поэтому выполняем колбэки сразу
+    return mock.patch(
+        'posts.autocomplete.transaction.on_commit', lambda func: func()
+    )
+
+
+class PrefixIndexTest(SimpleTestCase):
+    def setUp(self):
+        self.index = PrefixIndex()
+        self.index.add(1, 'Лев Толстой', ['leo', 'Лев', 'Толстой'])
+        self.index.add(2, 'Алёна', ['alena', 'Алёна'])
+        self.index.add(3, 'Лейла', ['leyla', 'Лейла'])
+
+    def test_prefix(self):
+        self.assertEqual(self.index.search('ле', 10), ['Лев Толстой', 'Лейла'])
+        self.assertEqual(self.index.search('ТОЛ', 10), ['Лев Толстой'])
+        self.assertEqual(self.index.search('але', 10), ['Алёна'])
+        self.assertEqual(self.index.search('', 10), [])
+
+    def test_limit_and_duplicates(self):
+        self.index.add(4, 'Леонид', ['leonid', 'Леонид', 'Леонидович'])
+        self.assertEqual(self.index.search('леон', 10), ['Леонид'])
+        self.assertEqual(len(self.index.search('л', 2)), 2)
+
+    def test_replace_and_remove(self):
+        self.index.add(1, 'Лев', ['Лев'])
+        self.assertEqual(self.index.search('тол', 10), [])
+        self.index.remove(3)
+        self.assertEqual(self.index.search('лей', 10), [])
+        self.assertEqual(len(self.index), 2)
+
+
+class AutocompleteTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='tolstoy', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Русская литература', slug='literature', description='-'
+        )
+
+    def setUp(self):
+        cache.clear()
+        process_index.reset()
+
+    def suggest(self, query):
+        response = self.client.get(AUTOCOMPLETE, {'q': query})
+        return [item['label'] for item in response.json()['results']]
+
+    def test_endpoint(self):
+        self.assertEqual(self.suggest('тол'), ['Лев Толстой'])
+        self.assertEqual(self.suggest('лит'), ['Русская литература'])
+        result = self.client.get(AUTOCOMPLETE, {'q': 'lit'}).json()
+        self.assertEqual(result['results'][0]['url'], '/group/literature/')
+
+    def test_answers_without_database(self):
+        self.suggest('т')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest('tol'), ['Лев Толстой'])
+
+    def test_signals_update_index(self):
+        self.suggest('т')
+        with run_on_commit():
+            User.objects.create_user(username='chekhov', first_name='Антон')
+        with run_on_commit():
+            self.group.title = 'Классика'
+            self.group.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest('ант'), ['Антон'])
+            self.assertEqual(self.suggest('клас'), ['Классика'])
+            self.assertEqual(self.suggest('русск'), [])
+        with run_on_commit():
+            User.objects.filter(username='chekhov').delete()
+        self.assertEqual(self.suggest('ант'), [])
+
+    def test_other_process_change_rebuilds(self):
+        """Чужая правка сдвигает поколение: индекс собирается заново."""
+        self.suggest('т')
+        cache.set(autocomplete.GENERATION_KEY, 100)
+        Group.objects.create(title='Поэзия', slug='poetry', description='-')
+        process_index.checked = 0
+        self.assertEqual(self.suggest('поэ'), ['Поэзия'])
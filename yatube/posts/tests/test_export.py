@@ -0,0 +1,91 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='-'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост, "в кавычках" {number}',
+                group=cls.group if number % 2 else None,
+            )
+            for number in range(5)
+        ]
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def content(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_profile_csv(self):
+        response = self.client.get(
+            reverse('posts:profile_export', args=('author',))
+        )
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('author-posts.csv', response['Content-Disposition'])
+        rows = list(csv.DictReader(
+            StringIO(self.content(response).decode())
+        ))
+        self.assertEqual(
+            [row['text'] for row in rows], [post.text for post in self.posts]
+        )
+        self.assertEqual(rows[1]['group'], 'group')
+
+    def test_group_jsonl_gzip(self):
+        response = self.client.get(
+            reverse('posts:group_export', args=('group',)),
+            {'format': 'jsonl', 'gzip': '1'},
+        )
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('group-posts.jsonl.gz', response['Content-Disposition'])
+        lines = gzip.decompress(self.content(response)).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [record['id'] for record in records],
+            [self.posts[1].pk, self.posts[3].pk],
+        )
+        self.assertEqual(records[0]['type'], 'post')
+        self.assertEqual(records[0]['author'], 'author')
+
+    def test_login_and_format_required(self):
+        url = reverse('posts:profile_export', args=('author',))
+        self.assertEqual(Client().get(url).status_code, 302)
+        self.assertEqual(
+            self.client.get(url, {'format': 'xml'}).status_code, 404
+        )
+
+    def test_round_trip_through_import(self):
+        """Выгрузка JSONL загружается обратно командой import_content."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'posts.jsonl')
+        call_command(
+            'export_posts', author='author', chunk_size=2, output=path
+        )
+        Post.objects.all().delete()
+        call_command('import_content', path, stdout=StringIO())
+        self.assertEqual(
+            list(Post.objects.order_by('pub_date')
+                 .values_list('text', 'pub_date')),
+            [(post.text, post.pub_date) for post in self.posts],
+        )
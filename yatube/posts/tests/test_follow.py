@@ -1,8 +1,16 @@
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
-from ..models import Follow, Post
+from .. import pull, timeline
+from ..follows import FollowSet, follow_set_key, following_ids
+from ..models import Follow, Post, TimelineEntry
 
 User = get_user_model()
 
@@ -15,6 +23,7 @@ class FollowTest(TestCase):
         cls.author = User.objects.create_user(username='author')
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.auth_client = Client()
         self.auth_client.force_login(self.user)
@@ -114,3 +123,238 @@ class FollowTest(TestCase):
             response,
             data['unpost']
         )
+
+
+@override_settings(TIMELINE_LENGTH=3)
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        for number in range(5):
+            Post.objects.create(text=f'Пост {number}', author=cls.author)
+
+    def feed_texts(self):
+        return list(
+            self.user.timeline.order_by('-pub_date')
+            .values_list('post__text', flat=True)
+        )
+
+    def test_follow_backfills_and_caps_timeline(self):
+        """Подписка заполняет ленту последними постами автора."""
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(self.feed_texts(), ['Пост 4', 'Пост 3', 'Пост 2'])
+
+    def test_new_post_fans_out_and_trims(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        Post.objects.create(text='Свежий пост', author=self.author)
+        self.assertEqual(
+            self.feed_texts(), ['Свежий пост', 'Пост 4', 'Пост 3']
+        )
+
+    def test_fan_out_trims_all_followers_at_once(self):
+        """Вставка и обрезка лент не зависят от числа подписчиков."""
+        readers = [self.user] + [
+            User.objects.create_user(username=f'reader{number}')
+            for number in range(3)
+        ]
+        for reader in readers:
+            Follow.objects.create(user=reader, author=self.author)
+        post = Post(text='Свежий пост', author=self.author)
+        post.save()
+        TimelineEntry.objects.filter(post=post).delete()
+        with self.assertNumQueries(2):
+            timeline.fan_out(post, [reader.pk for reader in readers])
+        for reader in readers:
+            self.assertEqual(
+                list(reader.timeline.order_by('-pub_date').values_list(
+                    'post__text', flat=True
+                )),
+                ['Свежий пост', 'Пост 4', 'Пост 3'],
+            )
+
+    def test_unfollow_clears_timeline(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.filter(user=self.user).delete()
+        self.assertEqual(self.feed_texts(), [])
+
+    def test_rebuild_command(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', length=2, stdout=StringIO())
+        self.assertEqual(self.feed_texts(), ['Пост 4', 'Пост 3'])
+
+
+@override_settings(FOLLOW_FEED_ENGINE='merge')
+class MergedFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.first = User.objects.create_user(username='first')
+        cls.second = User.objects.create_user(username='second')
+        Follow.objects.create(user=cls.user, author=cls.first)
+        Follow.objects.create(user=cls.user, author=cls.second)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def feed(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return [post.text for post in response.context.get('page_obj')]
+
+    def test_feed_merges_authors_by_date(self):
+        """Лента сливает посты авторов в порядке публикации."""
+        for number in range(3):
+            for author in (self.first, self.second):
+                Post.objects.create(
+                    text=f'{author.username} {number}', author=author
+                )
+        self.assertEqual(self.feed(), [
+            'second 2', 'first 2', 'second 1',
+            'first 1', 'second 0', 'first 0',
+        ])
+
+    def test_cached_lists_follow_create_and_delete(self):
+        post = Post.objects.create(text='Старый пост', author=self.first)
+        self.assertEqual(self.feed(), ['Старый пост'])
+        Post.objects.create(text='Новый пост', author=self.second)
+        post.delete()
+        self.assertEqual(self.feed(), ['Новый пост'])
+
+    def test_list_read_before_commit_is_forgotten(self):
+        """Список, загруженный до коммита, не остаётся в кеше."""
+        callbacks = []
+        with mock.patch('posts.pull.transaction.on_commit', callbacks.append):
+            Post.objects.create(text='Новый пост', author=self.first)
+        cache.set(pull.author_key(self.first.pk), [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.feed(), ['Новый пост'])
+
+
+class FollowBudgetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        for number in range(3):
+            author = User.objects.create_user(username=f'author{number}')
+            Follow.objects.create(user=cls.user, author=author)
+            for post_number in range(4):
+                Post.objects.create(
+                    text=f'Пост {number}.{post_number}', author=author
+                )
+
+    def test_follow_within_budget(self):
+        """Подписка с дозаполнением и обрезкой ленты — в бюджете."""
+        newcomer = User.objects.create_user(username='newcomer')
+        for number in range(3):
+            Post.objects.create(text=f'Новый {number}', author=newcomer)
+        self.client.force_login(self.user)
+        for engine in ('join', 'timeline', 'merge'):
+            Follow.objects.filter(author=newcomer).delete()
+            cache.clear()
+            with self.subTest(engine=engine), self.settings(
+                FOLLOW_FEED_ENGINE=engine,
+                TIMELINE_LENGTH=10,
+                QUERY_BUDGET_ENABLED=True,
+                QUERY_BUDGET_RAISE=True,
+            ):
+                self.client.get(
+                    reverse('posts:profile_follow', args=('newcomer',))
+                )
+                self.assertTrue(Follow.objects.filter(
+                    user=self.user, author=newcomer
+                ).exists())
+                self.client.get(
+                    reverse('posts:profile_unfollow', args=('newcomer',))
+                )
+
+    def test_follow_index_within_budget(self):
+        """Лента подписок укладывается в бюджет при любом движке."""
+        self.client.force_login(self.user)
+        expected = list(Post.objects.order_by('-pub_date', '-id').values_list(
+            'text', flat=True
+        )[:settings.PAGE])
+        for engine in ('join', 'timeline', 'merge'):
+            cache.clear()
+            with self.subTest(engine=engine), self.settings(
+                FOLLOW_FEED_ENGINE=engine,
+                QUERY_BUDGET_ENABLED=True,
+                QUERY_BUDGET_RAISE=True,
+            ):
+                response = self.client.get(reverse('posts:follow_index'))
+                self.assertEqual(
+                    [post.text for post in response.context['page_obj']],
+                    expected,
+                )
+
+
+class FollowSetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(3)
+        ]
+        Follow.objects.create(user=cls.user, author=cls.authors[2])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_follow_set_encoding(self):
+        """Множество хранится отсортированным массивом и ищется в памяти."""
+        follow_set = FollowSet([30, 10, 20])
+        restored = FollowSet.from_bytes(follow_set.to_bytes())
+        self.assertEqual(list(restored), [10, 20, 30])
+        self.assertIn(20, restored)
+        self.assertNotIn(15, restored)
+        self.assertEqual(len(follow_set.to_bytes()), 3 * 4)
+
+    def test_views_forget_cached_set(self):
+        """Подписка и отписка сбрасывают множество, оно читается заново."""
+        first, _, followed = self.authors
+        self.assertEqual(list(following_ids(self.user)), [followed.pk])
+        self.client.get(
+            reverse('posts:profile_follow', args=(first.username,))
+        )
+        self.assertIsNone(cache.get(follow_set_key(self.user.pk)))
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                list(following_ids(self.user)), [first.pk, followed.pk]
+            )
+        with self.assertNumQueries(0):
+            following_ids(self.user)
+        self.client.get(
+            reverse('posts:profile_unfollow', args=(followed.username,))
+        )
+        self.assertEqual(list(following_ids(self.user)), [first.pk])
+
+    def test_stale_cached_set_does_not_block_follow(self):
+        """Подписка пишется в базу, даже если кеш ошибочно её содержит."""
+        first = self.authors[0]
+        cache.set(
+            follow_set_key(self.user.pk),
+            FollowSet([first.pk]).to_bytes(),
+        )
+        self.client.get(
+            reverse('posts:profile_follow', args=(first.username,))
+        )
+        self.assertTrue(
+            Follow.objects.filter(user=self.user, author=first).exists()
+        )
+
+    def test_profile_checks_follow_in_memory(self):
+        """Профиль берёт признак подписки из множества, а не из базы."""
+        following_ids(self.user)
+        for author, expected in zip(self.authors, (False, False, True)):
+            response = self.client.get(
+                reverse('posts:profile', args=(author.username,))
+            )
+            self.assertEqual(response.context['following'], expected)
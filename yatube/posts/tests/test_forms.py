@@ -0,0 +1,67 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+ORIENTATION = 0x0112
+GPS_INFO = 0x8825
+
+
+def photo(size=(400, 200), orientation=6):
+    """JPEG «с телефона»: поворот и координаты в EXIF."""
+    exif = Image.Exif()
+    exif[ORIENTATION] = orientation
+    exif[GPS_INFO] = {1: 'N'}
+    buffer = BytesIO()
+    Image.new('RGB', size, 'green').save(buffer, 'JPEG', exif=exif)
+    return SimpleUploadedFile('photo.jpeg', buffer.getvalue())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_MAX_SIDE=100)
+class PostFormImageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def create(self, image):
+        return self.client.post(
+            reverse('posts:post_create'),
+            {'text': 'Пост с фото', 'image': image},
+        )
+
+    def test_image_is_downscaled_and_stripped(self):
+        """Оригинал ужат, повёрнут по EXIF и сохранён без метаданных."""
+        self.create(photo())
+        post = Post.objects.get(text='Пост с фото')
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.size, (50, 100))
+            self.assertEqual(stored.format, 'JPEG')
+            self.assertFalse(stored.getexif())
+        self.assertTrue(post.image.name.endswith('.jpg'))
+
+    @override_settings(IMAGE_MAX_PIXELS=1000)
+    def test_decompression_bomb_rejected(self):
+        response = self.create(photo())
+        self.assertFalse(Post.objects.filter(text='Пост с фото').exists())
+        self.assertFormError(
+            response, 'form', 'image',
+            'Слишком большое изображение: 400×200 пикселей',
+        )
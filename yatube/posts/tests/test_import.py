@@ -0,0 +1,186 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..importer import Importer
+from ..models import AuthorStats, Comment, Follow, Group, Post, TagEntry
+from ..search import search_page
+
+User = get_user_model()
+
+
+class ImportContentTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Старый пост')
+
+    def write(self, name, content):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def jsonl(self, records):
+        return self.write(
+            'content.jsonl',
+            '\n'.join(json.dumps(record, ensure_ascii=False)
+                      for record in records),
+        )
+
+    def run_import(self, path, **options):
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            'import_content', path, stdout=stdout, stderr=stderr, **options
+        )
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_import(self):
+        path = self.jsonl([
+            {'type': 'post', 'author': 'newbie', 'text': 'Привет #импорт',
+             'group': 'imported', 'pub_date': '2020-01-02T03:04:05',
+             'comments': [{'author': 'author', 'text': 'Ответ'}]},
+            {'type': 'comment', 'post_id': self.post.pk, 'author': 'newbie',
+             'text': 'К старому', 'created': '2021-05-06T07:08:09+00:00'},
+            {'type': 'comment', 'post_id': 10 ** 6, 'author': 'author',
+             'text': 'К несуществующему'},
+            {'type': 'follow', 'user': 'newbie', 'author': 'author'},
+            {'type': 'follow', 'user': 'newbie', 'author': 'author'},
+            {'type': 'follow', 'user': 'author', 'author': 'author'},
+            {'type': 'post', 'author': 'author', 'pub_date': 'вчера',
+             'text': 'Битая дата'},
+            {'type': 'like'},
+        ])
+        stdout, stderr = self.run_import(path, batch_size=3)
+        self.assertIn('Импорт завершён', stdout)
+        self.assertIn('неверная дата', stderr)
+        post = Post.objects.get(text='Привет #импорт')
+        self.assertEqual(post.author.username, 'newbie')
+        self.assertFalse(post.author.has_usable_password())
+        self.assertEqual(post.group, Group.objects.get(slug='imported'))
+        self.assertEqual(
+            post.pub_date, datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        )
+        self.assertEqual(post.comments.get().author, self.author)
+        self.assertEqual(
+            Comment.objects.get(text='К старому').created.year, 2021
+        )
+        self.assertFalse(Comment.objects.filter(
+            text='К несуществующему'
+        ).exists())
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertFalse(Post.objects.filter(text='Битая дата').exists())
+        # Производные данные пересчитаны
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(post.group.posts_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).followers_count, 1
+        )
+        self.assertTrue(TagEntry.objects.filter(name='импорт').exists())
+        self.assertEqual(list(search_page('привет', Post.objects, 10)),
+                         [post])
+
+    def test_invalid_names_rejected(self):
+        """Слаги и имена, которые не развернёт URL, отклоняются."""
+        path = self.jsonl([
+            {'type': 'post', 'author': 'author', 'text': 'Пост в группе',
+             'group': 'Русская литература'},
+            {'type': 'post', 'author': 'a/b', 'text': 'Имя со слешем'},
+            {'type': 'comment', 'post_id': self.post.pk, 'author': 'x y',
+             'text': 'Имя с пробелом'},
+            {'type': 'follow', 'user': 'author', 'author': '../admin'},
+            {'type': 'post', 'author': 'author', 'text': 'Без группы',
+             'group': ''},
+        ])
+        _, stderr = self.run_import(path)
+        self.assertIn("неверное поле group: 'Русская литература'", stderr)
+        self.assertIn("неверное поле author: 'a/b'", stderr)
+        self.assertEqual(stderr.count('неверное поле'), 4)
+        self.assertEqual(
+            list(Post.objects.filter(text__in=[
+                'Пост в группе', 'Имя со слешем', 'Без группы',
+            ]).values_list('text', flat=True)),
+            ['Без группы'],
+        )
+        self.assertFalse(Group.objects.exists())
+        self.assertFalse(User.objects.filter(
+            username__in=['a/b', 'x y', '../admin']
+        ).exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(self.client.get('/').status_code, 200)
+
+    def test_batch_locks_before_reserving_ids(self):
+        """Пачка начинается с записи позиции — до чтения max(id)."""
+        importer = Importer('locks.jsonl')
+        batch = [{'type': 'post', 'author': 'author', 'text': 'Пост'}]
+        with CaptureQueriesContext(connection) as queries:
+            importer.import_batch(batch, len(batch))
+        statements = [
+            query['sql'] for query in queries
+            if not query['sql'].startswith(('SAVEPOINT', 'RELEASE'))
+        ]
+        self.assertTrue(
+            statements[0].startswith('UPDATE "posts_importcheckpoint"')
+        )
+
+    def test_csv(self):
+        User.objects.create_user(username='reader')
+        path = self.write(
+            'follows.csv', 'user,author\nreader,author\nreader,reader\n'
+        )
+        self.run_import(path, type='follow')
+        self.assertEqual(
+            list(Follow.objects.values_list(
+                'user__username', 'author__username'
+            )),
+            [('reader', 'author')],
+        )
+
+    def test_resume(self):
+        """После сбоя импорт продолжается с первой незаписанной пачки."""
+        path = self.jsonl([
+            {'type': 'post', 'author': 'author', 'text': f'Пост {number}'}
+            for number in range(5)
+        ])
+        original = Importer.import_batch
+        calls = []
+
+        def failing(importer, records, size):
+            calls.append(size)
+            if len(calls) == 2:
+                raise RuntimeError('сбой')
+            return original(importer, records, size)
+
+        with mock.patch.object(Importer, 'import_batch', failing):
+            with self.assertRaises(RuntimeError):
+                self.run_import(path, batch_size=2)
+        self.assertEqual(
+            Post.objects.filter(text__startswith='Пост ').count(), 2
+        )
+        stdout, _ = self.run_import(path, batch_size=2)
+        self.assertIn('Продолжаем с записи 3', stdout)
+        self.assertEqual(
+            Post.objects.filter(text__startswith='Пост ').count(), 5
+        )
+        # Повторный запуск ничего не дублирует, --restart импортирует заново
+        self.run_import(path)
+        self.assertEqual(
+            Post.objects.filter(text__startswith='Пост ').count(), 5
+        )
+        self.run_import(path, restart=True)
+        self.assertEqual(
+            Post.objects.filter(text__startswith='Пост ').count(), 10
+        )
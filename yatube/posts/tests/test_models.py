@@ -1,7 +1,10 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import AuthorStats, Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -27,3 +30,66 @@ class PostModelTest(TestCase):
 
     def test_group_model_names(self):
         self.assertEqual(self.group.title, str(self.group))
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Первая группа', slug='first', description='Описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Вторая группа', slug='second', description='Описание',
+        )
+
+    def refresh(self, *objects):
+        for obj in objects:
+            obj.refresh_from_db()
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками."""
+        post = Post.objects.create(
+            author=self.user, text='Пост', group=self.group,
+        )
+        Comment.objects.create(post=post, author=self.reader, text='Да')
+        Follow.objects.create(user=self.reader, author=self.user)
+        stats, reader_stats = self.user.stats, self.reader.stats
+        self.refresh(stats, reader_stats, self.group, post)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(reader_stats.following_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(post.comments_count, 1)
+
+        post.group = self.other_group
+        post.save()
+        self.refresh(self.group, self.other_group)
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+
+        Follow.objects.all().delete()
+        post.delete()
+        self.refresh(stats, reader_stats, self.other_group)
+        self.assertEqual(stats.posts_count, 0)
+        self.assertEqual(stats.followers_count, 0)
+        self.assertEqual(reader_stats.following_count, 0)
+        self.assertEqual(self.other_group.posts_count, 0)
+
+    def test_recount_command_repairs_drift(self):
+        post = Post.objects.create(
+            author=self.user, text='Пост', group=self.group,
+        )
+        Comment.objects.create(post=post, author=self.reader, text='Да')
+        AuthorStats.objects.update(posts_count=42)
+        Group.objects.update(posts_count=42)
+        Post.objects.update(comments_count=42)
+        AuthorStats.objects.filter(user=self.reader).delete()
+        call_command('recount_counters', stdout=StringIO())
+        self.refresh(self.user.stats, self.group, post)
+        self.assertEqual(self.user.stats.posts_count, 1)
+        self.assertTrue(AuthorStats.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(post.comments_count, 1)
@@ -0,0 +1,81 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+FULL_SCAN = re.compile(r'\bSCAN (TABLE )?(?P<table>\w+)(?!\w| USING)')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+class QueryPlanTest(TestCase):
+    """Запросы лент и страниц идут по индексам, без полных проходов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание',
+        )
+        for number in range(15):
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}',
+            )
+        cls.post = Post.objects.first()
+        Comment.objects.create(post=cls.post, author=cls.reader, text='Да')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def full_scans(self, step):
+        match = FULL_SCAN.search(step)
+        tables = connection.introspection.table_names()
+        return bool(match) and match['table'] in tables
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assert_indexed(self, address):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(address)
+        for query in queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            for step in self.plan(sql):
+                with self.subTest(address=address, sql=sql, step=step):
+                    self.assertFalse(self.full_scans(step))
+                    self.assertNotIn(TEMP_SORT, step)
+
+    def test_views_use_indexes(self):
+        first_page = reverse('posts:index')
+        cursor = self.client.get(
+            first_page + '?cursor='
+        ).context['page_obj'].next_cursor
+        addresses = (
+            first_page,
+            first_page + '?page=2',
+            first_page + '?cursor=' + cursor,
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:group_list', args=(self.group.slug,))
+            + '?page=2',
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:profile', args=(self.author.username,))
+            + '?page=2',
+            reverse('posts:post_detail', args=(self.post.pk,)),
+            reverse('posts:follow_index'),
+            reverse('posts:follow_index') + '?page=2',
+        )
+        for address in addresses:
+            self.assert_indexed(address)
@@ -0,0 +1,125 @@
+from io import StringIO
+
+from django.contrib.admin.sites import AdminSite
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from ..admin import PostAdmin
+from ..models import Post
+from ..paginators import encode_cursor
+from ..search import fts_query, install_triggers, search_page
+
+User = get_user_model()
+SEARCH = reverse('posts:search')
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.cat = Post.objects.create(
+            author=cls.user, text='Кошка <b>спит</b> на солнце'
+        )
+        cls.dog = Post.objects.create(
+            author=cls.user, text='Собака гуляет, кошка смотрит'
+        )
+        Post.objects.create(author=cls.user, text='Совсем другой текст')
+
+    def test_query_is_escaped(self):
+        """Операторы FTS5 и кавычки из ввода не ломают запрос."""
+        self.assertEqual(fts_query('Кошка "OR" -спит'),
+                         '"кошка"* "or"* "спит"*')
+        self.assertEqual(fts_query('!!!'), '')
+
+    def test_search_page(self):
+        response = self.client.get(SEARCH, {'q': 'кошка'})
+        posts = list(response.context['page_obj'])
+        self.assertCountEqual(posts, [self.cat, self.dog])
+        self.assertContains(response, '<mark>Кошка</mark>')
+        # Текст поста экранируется, выделение — нет
+        self.assertContains(response, '&lt;b&gt;')
+
+    def test_prefix_and_all_terms(self):
+        self.assertEqual(
+            list(self.client.get(SEARCH, {'q': 'кош спит'})
+                 .context['page_obj']),
+            [self.cat],
+        )
+
+    def test_empty_query(self):
+        response = self.client.get(SEARCH, {'q': '  '})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_keyset_pages(self):
+        """Курсор продолжает выдачу без повторов и пропусков."""
+        for number in range(5):
+            Post.objects.create(author=self.user, text=f'повтор {number}')
+        seen = []
+        page = search_page('повтор', Post.objects.all(), 2)
+        seen.extend(page)
+        while page.has_next():
+            page = search_page(
+                'повтор', Post.objects.all(), 2, page.next_cursor
+            )
+            seen.extend(page)
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_bad_cursor_gives_first_page(self):
+        """Курсор не той формы не доходит до SQL."""
+        cursors = (
+            encode_cursor('next', [{'a': 1}]),
+            encode_cursor('next', ['ранг', self.cat.pk]),
+            encode_cursor('next', [-1.5, 'id']),
+            encode_cursor('next', [-1.5, 10 ** 23]),
+            encode_cursor('next', [-1.5, 1.5]),
+        )
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(
+                    SEARCH, {'q': 'кошка', 'cursor': cursor}
+                )
+                self.assertCountEqual(
+                    response.context['page_obj'], [self.cat, self.dog]
+                )
+
+    def test_index_follows_edits(self):
+        """Триггеры обновляют индекс при изменении и удалении поста."""
+        # Копии из базы: setUpTestData в Django 2.2 делит объекты между
+        # тестами, а delete() обнуляет pk
+        cat = Post.objects.get(pk=self.cat.pk)
+        cat.text = 'Попугай'
+        cat.save()
+        self.assertEqual(list(search_page('попугай', Post.objects, 10)),
+                         [cat])
+        self.assertEqual(list(search_page('спит', Post.objects, 10)), [])
+        Post.objects.get(pk=self.dog.pk).delete()
+        self.assertEqual(list(search_page('собака', Post.objects, 10)), [])
+
+    def test_bulk_create_is_indexed(self):
+        Post.objects.bulk_create([Post(author=self.user, text='Черепаха')])
+        self.assertEqual(len(search_page('черепаха', Post.objects, 10)), 1)
+
+    def test_restore_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER posts_post_fts_insert')
+        self.assertTrue(install_triggers())
+        self.assertFalse(install_triggers())
+        Post.objects.create(author=self.user, text='Жираф')
+        self.assertEqual(len(search_page('жираф', Post.objects, 10)), 1)
+
+    def test_rebuild_command(self):
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(search_page('кошка', Post.objects, 10)), 2)
+
+    def test_admin_search(self):
+        admin = PostAdmin(Post, AdminSite())
+        queryset, distinct = admin.get_search_results(
+            None, Post.objects.all(), 'собака'
+        )
+        self.assertEqual(list(queryset), [self.dog])
+        self.assertFalse(distinct)
@@ -0,0 +1,130 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post, TagEntry
+from ..tags import extract, index_post
+
+User = get_user_model()
+
+
+class TagIndexTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def labels(self, post):
+        return set(post.tag_entries.values_list('kind', 'name'))
+
+    def test_extract(self):
+        self.assertEqual(
+            extract('#Котики и #котики, привет @reader. Пишите a@b.ru'),
+            {(TagEntry.HASHTAG, 'котики'), (TagEntry.MENTION, 'reader')},
+        )
+
+    def test_index_on_create_and_edit(self):
+        """Правка поста меняет только исчезнувшие и новые метки."""
+        post = Post.objects.create(author=self.author, text='#один #два')
+        self.assertEqual(self.labels(post), {
+            (TagEntry.HASHTAG, 'один'), (TagEntry.HASHTAG, 'два'),
+        })
+        kept = post.tag_entries.get(name='два').pk
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        with self.settings(
+            QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_RAISE=True
+        ):
+            self.author_client.post(
+                reverse('posts:post_edit', args=(post.pk,)),
+                {'text': '#два #три'},
+            )
+        self.assertEqual(self.labels(post), {
+            (TagEntry.HASHTAG, 'два'), (TagEntry.HASHTAG, 'три'),
+        })
+        self.assertEqual(post.tag_entries.get(name='два').pk, kept)
+
+    def test_write_views_within_budget(self):
+        """Создание и правка поста с метками и группой — в бюджете."""
+        groups = [
+            Group.objects.create(title=f'Группа {number}', slug=f'g{number}')
+            for number in range(2)
+        ]
+        client = Client()
+        client.force_login(self.author)
+        with self.settings(
+            QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_RAISE=True
+        ):
+            client.post(reverse('posts:post_create'), {
+                'text': '#один @reader', 'group': groups[0].pk,
+            })
+            post = Post.objects.get(text='#один @reader')
+            client.post(reverse('posts:post_edit', args=(post.pk,)), {
+                'text': '#два', 'group': groups[1].pk,
+            })
+        self.assertEqual(self.labels(post), {(TagEntry.HASHTAG, 'два')})
+
+    def test_unchanged_text_is_not_reindexed(self):
+        post = Post.objects.create(author=self.author, text='#тег')
+        post = Post.objects.get(pk=post.pk)
+        with self.assertNumQueries(1):
+            post.save()
+
+    def test_tag_feed(self):
+        posts = [
+            Post.objects.create(author=self.author, text=f'#Лента {number}')
+            for number in range(3)
+        ]
+        Post.objects.create(author=self.author, text='без тегов')
+        with self.settings(PAGE=2):
+            response = self.client.get(reverse('posts:tag', args=('лента',)))
+            page_obj = response.context['page_obj']
+            self.assertEqual(list(page_obj), posts[:0:-1])
+            response = self.client.get(
+                reverse('posts:tag', args=('ЛЕНТА',)),
+                {'cursor': page_obj.next_cursor},
+            )
+        self.assertEqual(list(response.context['page_obj']), [posts[0]])
+        self.assertContains(
+            response, f'<a href="{reverse("posts:tag", args=("лента",))}">'
+        )
+
+    def test_mentions_feed(self):
+        post = Post.objects.create(author=self.author, text='Привет, @reader!')
+        Post.objects.create(author=self.author, text='Привет, @someone')
+        response = self.reader_client.get(reverse('posts:mentions'))
+        self.assertEqual(list(response.context['page_obj']), [post])
+        self.assertContains(
+            response,
+            f'<a href="{reverse("posts:profile", args=("reader",))}">'
+            '@reader</a>',
+        )
+
+    def test_mentions_requires_login(self):
+        response = self.client.get(reverse('posts:mentions'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_backfill_command(self):
+        Post.objects.bulk_create([
+            Post(author=self.author, text=f'#старое {number}')
+            for number in range(5)
+        ])
+        self.assertFalse(TagEntry.objects.exists())
+        call_command('backfill_tags', chunk_size=2, stdout=StringIO())
+        self.assertEqual(TagEntry.objects.filter(name='старое').count(), 5)
+        # Повторный запуск не плодит дубликатов
+        call_command('backfill_tags', stdout=StringIO())
+        self.assertEqual(TagEntry.objects.count(), 5)
+
+    def test_reindex_is_idempotent(self):
+        post = Post.objects.create(author=self.author, text='#раз @reader')
+        index_post(post)
+        self.assertEqual(post.tag_entries.count(), 2)
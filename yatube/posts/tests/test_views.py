@@ -1,10 +1,26 @@
+import shutil
+import tempfile
+from http import HTTPStatus
+from io import BytesIO, StringIO
+from unittest import mock
+
+from PIL import Image
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Group, Post
+from .. import generations, thumbnails
+from ..feeds import count_key
+from ..models import Comment, Follow, Group, Post
+from ..paginators import FeedPaginator, encode_cursor
+from ..templatetags.post_cards import post_cards
 
 User = get_user_model()
 GROUP_LIST = reverse('posts:group_list', args=('test-slug',))
@@ -77,19 +93,65 @@ class PostViewsTest(TestCase):
                 self.assertEqual(post.author, self.post.author)
 
     def test_cache_index(self):
+        """Страница берётся из кеша, пока не изменится поколение ленты."""
+        cache.clear()
         response = self.guest_client.get(reverse('posts:index'))
         posts = response.content
-        Post.objects.create(
-            text='Тестовый пост',
-            author=self.user,
-        )
+        Post.objects.filter(pk=self.post.pk).update(text='Мимо сигналов')
         response_old = self.guest_client.get(reverse('posts:index'))
         old_posts = response_old.content
         self.assertEqual(old_posts, posts)
-        cache.clear()
+        Post.objects.create(
+            text='Новый пост',
+            author=self.user,
+        )
         response_new = self.guest_client.get(reverse('posts:index'))
-        new_posts = response_new.content
-        self.assertNotEqual(old_posts, new_posts)
+        self.assertContains(response_new, 'Новый пост')
+
+    def test_fragments_follow_generations(self):
+        pages = (
+            reverse('posts:group_list', args=(self.group.slug,)),
+            PROFILE,
+            self.POST_DETAIL,
+        )
+        for address in pages:
+            self.guest_client.get(address)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный пост'
+        post.save()
+        for address in pages:
+            with self.subTest(address=address):
+                self.assertContains(
+                    self.guest_client.get(address), 'Исправленный пост'
+                )
+
+    def test_generations_bumped_again_on_commit(self):
+        """Страница, собранная до коммита, не переживёт его в кеше."""
+        key = generations.generation_key('post', self.post.pk)
+        callbacks = []
+        with mock.patch(
+            'posts.generations.transaction.on_commit', callbacks.append
+        ):
+            Comment.objects.create(
+                post=self.post, author=self.user, text='Комментарий'
+            )
+        before_commit = generations.current(key)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(generations.current(key), before_commit)
+
+    def test_feed_counts_forgotten_again_on_commit(self):
+        """Размер ленты, посчитанный до коммита, удаляется после него."""
+        key = count_key('author', self.user.pk)
+        callbacks = []
+        with mock.patch(
+            'posts.feeds.transaction.on_commit', callbacks.append
+        ):
+            Post.objects.create(text='Ещё пост', author=self.user)
+        cache.set(key, 1)
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(cache.get(key))
 
 
 LIMIT_POST = 13
@@ -146,3 +208,468 @@ class PaginatorTest(TestCase):
                             len(response.context.get('page_obj').object_list),
                             quantity
                         )
+
+    def test_cursor_pages(self):
+        """Курсорная навигация проходит ленту вперёд и назад."""
+        urls = (
+            ('posts:index', None,),
+            ('posts:group_list', (self.group.slug,),),
+            ('posts:profile', (self.user.username,),),
+            ('posts:follow_index', None,),
+        )
+        for name, args in urls:
+            with self.subTest(name=name):
+                address = reverse(name, args=args)
+                first = self.follower_client.get(
+                    address + '?cursor='
+                ).context.get('page_obj')
+                self.assertEqual(len(first), settings.PAGE)
+                self.assertFalse(first.has_previous())
+                second = self.follower_client.get(
+                    address + '?cursor=' + first.next_cursor
+                ).context.get('page_obj')
+                self.assertEqual(len(second), LIMIT_POST - settings.PAGE)
+                self.assertFalse(second.has_next())
+                self.assertFalse(
+                    set(first.object_list) & set(second.object_list)
+                )
+                back = self.follower_client.get(
+                    address + '?cursor=' + second.previous_cursor
+                ).context.get('page_obj')
+                self.assertEqual(back.object_list, first.object_list)
+                self.assertFalse(back.has_previous())
+
+    def test_broken_cursor_gives_first_page(self):
+        response = self.follower_client.get(
+            reverse('posts:index') + '?cursor=broken'
+        )
+        self.assertEqual(
+            len(response.context.get('page_obj')), settings.PAGE
+        )
+
+    def test_out_of_range_cursor_gives_first_page(self):
+        cursors = (
+            encode_cursor('next', ['2020-01-01T00:00:00+00:00', 10 ** 23]),
+            encode_cursor('next', [{'a': 1}, 1]),
+            encode_cursor('prev', [None, True]),
+        )
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.follower_client.get(
+                    reverse('posts:index') + '?cursor=' + cursor
+                )
+                self.assertEqual(
+                    len(response.context.get('page_obj')), settings.PAGE
+                )
+
+
+class QueryCountTest(TestCase):
+    """Число запросов страницы не зависит от числа постов на ней."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание',
+        )
+        authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(4)
+        ]
+        for number in range(24):
+            Post.objects.create(
+                author=authors[number % len(authors)],
+                group=cls.group if number % 2 else None,
+                text=f'Пост {number}',
+            )
+        for author in authors:
+            Follow.objects.create(user=cls.reader, author=author)
+        cls.author = authors[0]
+        cls.post = Post.objects.filter(author=cls.author).first()
+        for author in authors:
+            Comment.objects.create(post=cls.post, author=author, text='Да')
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def count_queries(self, address, page_size):
+        cache.clear()
+        with self.settings(PAGE=page_size):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(address)
+        return len(queries)
+
+    def test_query_counts_are_locked(self):
+        pages = {
+            reverse('posts:index'): 6,
+            reverse('posts:index') + '?cursor=': 5,
+            reverse('posts:group_list', args=(self.group.slug,)): 7,
+            reverse('posts:profile', args=(self.author.username,)): 8,
+            reverse('posts:follow_index'): 6,
+            reverse('posts:post_detail', args=(self.post.pk,)): 6,
+        }
+        for address, expected in pages.items():
+            with self.subTest(address=address):
+                self.assertEqual(self.count_queries(address, 2), expected)
+                self.assertEqual(self.count_queries(address, 20), expected)
+
+
+class FeedPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_page_window(self):
+        """Окно страниц не растёт вместе с лентой."""
+        paginator = FeedPaginator(range(1000), 10)
+        windows = {
+            50: [1, None, 48, 49, 50, 51, 52, None, 100],
+            1: [1, 2, 3, None, 100],
+            4: [1, 2, 3, 4, 5, 6, None, 100],
+        }
+        for number, window in windows.items():
+            with self.subTest(number=number):
+                self.assertEqual(paginator.page_window(number), window)
+        self.assertEqual(
+            FeedPaginator(range(30), 10).page_window(2), [1, 2, 3]
+        )
+
+    def test_count_is_cached_and_invalidated(self):
+        Post.objects.create(author=self.user, text='Первый')
+        address = reverse('posts:profile', args=(self.user.username,))
+        self.client.get(address)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(address)
+        self.assertFalse(
+            [query for query in queries if 'COUNT(' in query['sql']]
+        )
+        Post.objects.create(author=self.user, text='Второй')
+        page_obj = self.client.get(address).context.get('page_obj')
+        self.assertEqual(page_obj.paginator.count, 2)
+
+
+class PostCardsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cards_rendered_once_and_shared(self):
+        """Карточки берутся одним get_many и рендерятся только при промахе."""
+        cards = post_cards(Post.objects.all())
+        self.assertEqual(len(cards), 3)
+        with mock.patch(
+            'posts.templatetags.post_cards.render_to_string'
+        ) as render:
+            again = post_cards(Post.objects.all())
+        render.assert_not_called()
+        self.assertEqual(again, cards)
+
+    def test_edit_renders_new_card(self):
+        post = self.posts[0]
+        post_cards([post])
+        post.text = 'Исправленный пост'
+        post.save()
+        html = post_cards([post])[0][1]
+        self.assertIn('Исправленный пост', html)
+
+    def test_author_rename_renders_new_cards(self):
+        post_cards(Post.objects.all())
+        author = User.objects.get(pk=self.user.pk)
+        author.first_name, author.last_name = 'Лев', 'Толстой'
+        author.save()
+        for _, html in post_cards(Post.objects.select_related('author')):
+            self.assertIn('Лев Толстой', html)
+
+    def test_anonymous_profile_shows_new_name(self):
+        profile = reverse('posts:profile', args=(self.user.username,))
+        self.client.get(profile)
+        author = User.objects.get(pk=self.user.pk)
+        author.first_name = 'Лев'
+        author.save(update_fields=['first_name'])
+        self.assertContains(self.client.get(profile), 'Лев')
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.user, text='Первый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_anonymous_page_served_from_cache(self):
+        """Повторный анонимный запрос не трогает ни базу, ни шаблоны."""
+        address = reverse('posts:index')
+        first = self.guest_client.get(address)
+        self.assertIn('ETag', first)
+        self.assertIn('Last-Modified', first)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.guest_client.get(address)
+        self.assertFalse(
+            [query for query in queries if 'SELECT' in query['sql']]
+        )
+        self.assertIsNone(second.context)
+        self.assertEqual(second.content, first.content)
+
+    def test_conditional_get(self):
+        address = reverse('posts:post_detail', args=(self.post.pk,))
+        etag = self.guest_client.get(address)['ETag']
+        response = self.guest_client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.post.comments.create(author=self.user, text='Комментарий')
+        response = self.guest_client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Комментарий')
+
+    def test_group_edit_refreshes_group_page(self):
+        group = Group.objects.create(title='Старое название', slug='group')
+        address = reverse('posts:group_list', args=(group.slug,))
+        self.guest_client.get(address)
+        group.title = 'Новое название'
+        group.save()
+        self.assertContains(self.guest_client.get(address), 'Новое название')
+
+    def test_authorized_user_bypasses_cache(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('ETag', response)
+
+
+@override_settings(COMMENTS_PAGE=3)
+class CommentsPageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {number}'
+            )
+            for number in range(7)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_first_page_inline(self):
+        """На странице поста — первая порция по дате и счётчик."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        page = response.context['comments']
+        self.assertEqual(list(page), self.comments[:3])
+        self.assertContains(response, 'Комментарии: 7')
+        self.assertContains(response, 'data-more-comments')
+
+    def test_fragment_pages(self):
+        """Фрагменты по курсору отдают остальные комментарии по порядку."""
+        page = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        ).context['comments']
+        seen = list(page)
+        while page.has_next():
+            response = self.client.get(
+                reverse('posts:post_comments', args=(self.post.pk,)),
+                {'cursor': page.next_cursor},
+            )
+            page = response.context['comments']
+            seen.extend(page)
+        self.assertEqual(seen, self.comments)
+        self.assertNotContains(response, 'data-more-comments')
+        self.assertNotContains(response, '<html')
+
+    def test_fragment_unknown_post(self):
+        """Фрагмент несуществующего поста — 404, поста без комментариев —
+        пустой список."""
+        response = self.client.get(
+            reverse('posts:post_comments', args=(10 ** 6,))
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        empty = Post.objects.create(author=self.user, text='Без комментариев')
+        response = self.client.get(
+            reverse('posts:post_comments', args=(empty.pk,))
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(list(response.context['comments']), [])
+
+    def test_fragment_query_count(self):
+        """Порция комментариев с авторами — один SELECT."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(
+                reverse('posts:post_comments', args=(self.post.pk,))
+            )
+        self.assertEqual(
+            len([query for query in queries if 'SELECT' in query['sql']]), 1
+        )
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def rendition(image, name):
+    """Миниатюра вида name так, как её получают шаблоны, — через prefetch."""
+    return thumbnails.prefetch([image], [name])[image.name, name]
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        buffer = BytesIO()
+        Image.new('RGB', (100, 50), 'red').save(buffer, 'PNG')
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('small.png', buffer.getvalue()),
+        )
+
+    def test_pending_rendition_falls_back_to_original(self):
+        """Пока миниатюры нет, страница показывает исходный файл."""
+        with mock.patch('posts.thumbnails.generate') as generate:
+            response = self.client.get(
+                reverse('posts:post_detail', args=(self.post.pk,))
+            )
+        generate.assert_not_called()
+        self.assertContains(response, self.post.image.url)
+
+    def test_generated_rendition_is_used(self):
+        thumbnails.generate(self.post.image.name)
+        thumbnail = rendition(self.post.image, 'card')
+        self.assertEqual((thumbnail.width, thumbnail.height), (960, 339))
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        self.assertContains(response, thumbnail.url)
+        self.assertNotContains(response, self.post.image.url)
+
+    @override_settings(THUMBNAIL_SYNC=True)
+    def test_sync_mode_generates_on_save(self):
+        buffer = BytesIO()
+        Image.new('RGB', (50, 50), 'blue').save(buffer, 'PNG')
+        self.post.image = SimpleUploadedFile('other.png', buffer.getvalue())
+        self.post.save()
+        thumbnail = rendition(self.post.image, 'card')
+        self.assertNotEqual(thumbnail, self.post.image)
+
+    def test_page_prefetch_is_one_lookup(self):
+        """Миниатюры карточек страницы ищутся одним запросом к базе."""
+        posts = [self.post] + [
+            Post.objects.create(
+                author=self.user, text=f'Копия {number}', image=self.post.image
+            )
+            for number in range(3)
+        ]
+        thumbnails.generate(self.post.image.name)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            cards = post_cards(posts)
+        lookups = [
+            query for query in queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+        self.assertEqual(len(lookups), 1)
+        thumbnail = rendition(self.post.image, 'card')
+        for _, html in cards:
+            self.assertIn(thumbnail.url, html)
+
+    def test_srcset_from_stored_sizes(self):
+        """<img> получает srcset и размеры, не открывая файлы при рендере."""
+        self.assertEqual(
+            (self.post.image_width, self.post.image_height), (100, 50)
+        )
+        address = reverse('posts:post_detail', args=(self.post.pk,))
+        with mock.patch('PIL.Image.open') as image_open:
+            response = self.client.get(address)
+        image_open.assert_not_called()
+        self.assertContains(response, 'width="100" height="50"')
+        self.assertNotContains(response, 'srcset')
+        thumbnails.generate(self.post.image.name)
+        cache.clear()
+        response = self.client.get(address)
+        small = rendition(self.post.image, 'card_480')
+        card = rendition(self.post.image, 'card')
+        self.assertContains(
+            response, f'srcset="{small.url} 480w, {card.url} 960w"'
+        )
+        self.assertContains(response, 'width="960" height="339"')
+        self.assertContains(response, 'loading="lazy"')
+
+    @override_settings(IMAGE_VARIANTS=('PNG',))
+    def test_variants_served_in_picture(self):
+        """Миниатюры в форматах IMAGE_VARIANTS идут в <source>."""
+        thumbnails.generate(self.post.image.name)
+        small = rendition(self.post.image, 'card_480.png')
+        card = rendition(self.post.image, 'card.png')
+        self.assertEqual((card.width, card.height), (960, 339))
+        self.assertTrue(card.name.endswith('.png'))
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        self.assertContains(
+            response,
+            f'<picture><source type="image/png" '
+            f'srcset="{small.url} 480w, {card.url} 960w"',
+        )
+
+    def test_command_generates_each_image_once(self):
+        """Общий файл нескольких постов обрабатывается один раз."""
+        Post.objects.create(
+            author=self.user, text='Копия', image=self.post.image.name
+        )
+        with mock.patch('posts.thumbnails.generate') as generate:
+            call_command('generate_thumbnails', stdout=StringIO())
+        generate.assert_called_once_with(self.post.image.name)
+
+    @override_settings(IMAGE_VARIANTS=('PNG',), THUMBNAIL_SYNC=True)
+    def test_thumbnails_removed_with_image(self):
+        """Замена и удаление картинки удаляют её миниатюры и копии."""
+        thumbnails.generate(self.post.image.name)
+        old = [
+            rendition(self.post.image, name)
+            for name in thumbnails.renditions()
+        ]
+        buffer = BytesIO()
+        Image.new('RGB', (50, 50), 'blue').save(buffer, 'PNG')
+        self.post.image = SimpleUploadedFile('other.png', buffer.getvalue())
+        self.post.save()
+        for thumbnail in old:
+            self.assertFalse(thumbnail.exists())
+        new = rendition(self.post.image, 'card.png')
+        self.assertTrue(new.exists())
+        self.post.delete()
+        self.assertFalse(new.exists())
+
+    def test_refresh_after_generation(self):
+        """Готовая миниатюра меняет дату изменения поста и его поколения."""
+        modified = self.post.modified
+        thumbnails.refresh_posts(self.post.image.name)
+        self.post.refresh_from_db()
+        self.assertGreater(self.post.modified, modified)
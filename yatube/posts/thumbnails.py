@@ -0,0 +1,229 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.base import EXTENSIONS, ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as DBKVStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from . import generations, images
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+class RenditionBackend(ThumbnailBackend):
+    """Бэкенд sorl, умеющий назвать файл миниатюры, не создавая её."""
+
+    def prepare_options(self, source, options):
+        # Те же умолчания, что в ThumbnailBackend.get_thumbnail: от них
+        # зависит имя файла миниатюры
+        options = dict(options)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
+
+    def thumbnail_file(self, file_, geometry_string, **options):
+        source = ImageFile(file_)
+        options = self.prepare_options(source, options)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+
+def executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    return _executor
+
+
+def variant_formats():
+    # Имя файла sorl строит только для известных ему форматов: AVIF
+    # появится, когда его добавят в sorl.thumbnail.base.EXTENSIONS
+    return [
+        image_format for image_format in images.variant_formats()
+        if image_format in EXTENSIONS
+    ]
+
+
+def variant_name(name, image_format):
+    return f'{name}.{image_format.lower()}'
+
+
+def renditions():
+    """THUMBNAIL_RENDITIONS и те же миниатюры в форматах IMAGE_VARIANTS.
+
+    Копия вида card в WebP называется card.webp; шаблоны отдают такие
+    копии через <source> в <picture>.
+    """
+    result = dict(settings.THUMBNAIL_RENDITIONS)
+    for image_format in variant_formats():
+        extra = {'format': image_format}
+        quality = images.SAVE_OPTIONS.get(image_format, {}).get('quality')
+        if quality:
+            extra['quality'] = quality
+        for name, (geometry, options) in (
+            settings.THUMBNAIL_RENDITIONS.items()
+        ):
+            result[variant_name(name, image_format)] = (
+                geometry, dict(options, **extra)
+            )
+    return result
+
+
+def generate(name):
+    """Создаёт все миниатюры из renditions() для файла name."""
+    for geometry, options in renditions().values():
+        default.backend.get_thumbnail(name, geometry, **options)
+
+
+def remove(name):
+    """Удаляет миниатюры файла, если он больше не нужен ни одному посту.
+
+    Сам оригинал не трогаем, как и Django при удалении модели.
+    """
+    if Post.objects.filter(image=name).exists():
+        return
+    default.kvstore.delete(ImageFile(name))
+
+
+def refresh_posts(name):
+    """Сбрасывает кеш постов с этим файлом: в них была запасная картинка."""
+    posts = Post.objects.filter(image=name)
+    for post in posts.only('author', 'group'):
+        generations.bump(*generations.post_keys(post))
+    # Новая дата изменения меняет и ключ закешированной карточки
+    posts.update(modified=timezone.now())
+
+
+def work(name):
+    try:
+        generate(name)
+        refresh_posts(name)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+    finally:
+        with _lock:
+            _pending.discard(name)
+        # Соединения с базой у каждого потока свои
+        connections.close_all()
+
+
+def schedule(name):
+    """Ставит файл в очередь пула после фиксации транзакции.
+
+    С THUMBNAIL_SYNC миниатюры создаются сразу, в том же потоке.
+    """
+    if not name:
+        return
+    if settings.THUMBNAIL_SYNC:
+        generate(name)
+        return
+    transaction.on_commit(lambda: submit(name))
+
+
+def discard(name):
+    """Ставит удаление миниатюр старой картинки после фиксации транзакции.
+
+    С THUMBNAIL_SYNC миниатюры удаляются сразу.
+    """
+    if not name:
+        return
+    if settings.THUMBNAIL_SYNC:
+        remove(name)
+        return
+    transaction.on_commit(lambda: executor().submit(remove_work, name))
+
+
+def remove_work(name):
+    try:
+        remove(name)
+    except Exception:
+        logger.exception('Не удалось удалить миниатюры %s', name)
+    finally:
+        connections.close_all()
+
+
+def submit(name):
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    executor().submit(work, name)
+
+
+def lookup_raw(keys):
+    """Сырые значения хранилища ключей sorl: один get_many по кешу и
+    не больше одного запроса к базе на все промахи."""
+    kvstore = default.kvstore
+    if not isinstance(kvstore, DBKVStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    found = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        rows = dict(
+            KVStoreModel.objects.filter(key__in=missing)
+            .values_list('key', 'value')
+        )
+        fetched = {key: rows.get(key, EMPTY_VALUE) for key in missing}
+        # Отсутствие тоже кешируем, как это делает сам KVStore
+        kvstore.cache.set_many(
+            fetched, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT
+        )
+        found.update(fetched)
+    return {
+        key: None if value == EMPTY_VALUE else value
+        for key, value in found.items()
+    }
+
+
+def prefetch(images, names=None):
+    """Миниатюры сразу для всех изображений страницы.
+
+    Возвращает {(имя файла, вид): миниатюра}; для ещё не готовых — исходное
+    изображение, а создание ставится в очередь.
+    """
+    config = renditions()
+    names = names or config
+    wanted = {}
+    for image in images:
+        if not image:
+            continue
+        for name in names:
+            geometry, options = config[name]
+            thumbnail = default.backend.thumbnail_file(
+                image, geometry, **options
+            )
+            wanted[add_prefix(thumbnail.key)] = (image, name)
+    found = lookup_raw(list(wanted))
+    result = {}
+    for key, (image, name) in wanted.items():
+        if found.get(key):
+            result[image.name, name] = deserialize_image_file(found[key])
+        else:
+            schedule(image.name)
+            result[image.name, name] = image
+    return result
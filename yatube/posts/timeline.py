@@ -0,0 +1,124 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, IntegerField, Value, Window
+from django.db.models.functions import RowNumber
+
+from .follows import follower_ids
+from .models import Follow, Post, TimelineEntry
+
+FEED_ORDERING = ('-feed_date', '-feed_post')
+TABLE = TimelineEntry._meta.db_table
+TRIM_SQL = f'''
+    DELETE FROM {TABLE} WHERE id IN (
+        SELECT id FROM ({{}}) AS ranked WHERE position > %s
+    )
+'''
+BACKFILL_SQL = f'''
+    INSERT OR IGNORE INTO {TABLE} (user_id, post_id, pub_date)
+    SELECT follower, id, pub_date FROM ({{}}) AS posts
+'''
+REBUILD_SQL = f'''
+    INSERT INTO {TABLE} (user_id, post_id, pub_date)
+    SELECT user_id, id, pub_date FROM ({{}}) AS ranked
+    WHERE position <= %s
+'''
+
+
+def timeline_length():
+    return settings.TIMELINE_LENGTH
+
+
+def execute(template, queryset, *params):
+    """Выполняет SQL вокруг запроса ORM: {} в template — его текст."""
+    sql, inner_params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(template.format(sql), (*inner_params, *params))
+
+
+def ranked(queryset, partition, order_by):
+    """Записи queryset с номером position внутри partition."""
+    return queryset.annotate(position=Window(
+        RowNumber(), partition_by=[F(partition)], order_by=order_by,
+    )).order_by()
+
+
+def trim(user_ids, length=None):
+    """Обрезает ленты пользователей до заданной длины одним DELETE.
+
+    ROW_NUMBER() нумерует записи каждой ленты от новых к старым;
+    удаляются все, чей номер больше length.
+    """
+    length = length or timeline_length()
+    entries = ranked(
+        TimelineEntry.objects.filter(user_id__in=list(user_ids)),
+        'user_id',
+        [F('pub_date').desc(), F('post_id').desc()],
+    ).values_list('id', 'position')
+    execute(TRIM_SQL, entries, length)
+
+
+def fan_out(post, followers=None):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if followers is None:
+        followers = follower_ids(post.author_id)
+    if not followers:
+        return
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers
+        ],
+        ignore_conflicts=True,
+    )
+    trim(followers)
+
+
+def backfill(user_id, author_id, length=None):
+    """Добавляет в ленту последние посты автора, на которого подписались.
+
+    Посты копируются одним INSERT … SELECT, а не пачками bulk_create.
+    """
+    length = length or timeline_length()
+    posts = Post.objects.filter(author_id=author_id).annotate(
+        follower=Value(user_id, IntegerField())
+    ).order_by('-pub_date', '-id').values_list(
+        'follower', 'id', 'pub_date'
+    )[:length]
+    execute(BACKFILL_SQL, posts)
+    trim([user_id], length)
+
+
+def remove(user_id, author_id):
+    """Убирает из ленты посты автора, от которого отписались."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild(length=None):
+    """Пересобирает все ленты с нуля, возвращает число подписчиков.
+
+    Всё в одной транзакции: читатели видят старые ленты до коммита.
+    Ленты заполняются одним INSERT … SELECT — по length последних
+    постов авторов каждого подписчика.
+    """
+    length = length or timeline_length()
+    entries = ranked(
+        Follow.objects.filter(author__posts__isnull=False),
+        'user_id',
+        [F('author__posts__pub_date').desc(), F('author__posts__id').desc()],
+    ).values_list(
+        'user_id', 'author__posts__id', 'author__posts__pub_date', 'position'
+    )
+    with transaction.atomic():
+        TimelineEntry.objects.all().delete()
+        execute(REBUILD_SQL, entries, length)
+    return Follow.objects.order_by().values('user_id').distinct().count()
+
+
+def follow_feed(user):
+    """Лента подписок: диапазонное чтение ленты по (user, pub_date)."""
+    return Post.objects.filter(timeline_entries__user=user).annotate(
+        feed_date=F('timeline_entries__pub_date'),
+        feed_post=F('timeline_entries__post'),
+    ).order_by(*FEED_ORDERING)
@@ -1,69 +1,240 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import QuerySet
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
+from core.decorators import query_budget
+
+from . import autocomplete, export, tags
+from .counters import stats_for
+from .feeds import (DEFAULT_ORDERING, comments_page, count_key, follow_feed,
+                    with_cards)
+from .follows import is_following
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .generations import fragment_context, generation_key
+from .models import Follow, Group, Post, TagEntry, User
+from .page_cache import (cache_anonymous_page, group_keys, index_keys,
+                         post_keys, profile_keys)
+from .paginators import CursorPaginator, FeedPaginator
+from .search import search_page
+
 
+def pageobj(post_list, request, ordering=DEFAULT_ORDERING, count_key=None):
+    """Страница ленты: по ?cursor= — курсорная, иначе классическая ?page=.
 
-def pageobj(post_list, request):
-    paginator = Paginator(post_list, settings.PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    Курсор имеет смысл только для запросов к базе; готовые списки
+    в памяти всегда листаются по номеру страницы.
+    """
+    cursor = request.GET.get('cursor')
+    if cursor is not None and isinstance(post_list, QuerySet):
+        page_obj = CursorPaginator(
+            post_list, settings.PAGE, ordering
+        ).get_page(cursor)
+    else:
+        paginator = FeedPaginator(post_list, settings.PAGE, count_key)
+        page_obj = paginator.get_page(request.GET.get('page'))
     return {
         'page_obj': page_obj,
     }
 
 
+@query_budget(queries=4)
+@cache_anonymous_page(index_keys)
 def index(request):
-    context = pageobj(Post.objects.all(), request)
+    context = pageobj(
+        with_cards(Post.objects.all()), request, count_key=count_key('index')
+    )
+    context.update(fragment_context(generation_key('index')))
     return render(request, 'posts/index.html', context)
 
 
+@query_budget(queries=5)
+@cache_anonymous_page(group_keys)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     context = {
         'group': group,
     }
-    context.update(pageobj(group.posts.all(), request))
+    context.update(pageobj(
+        with_cards(group.posts.all()),
+        request,
+        count_key=count_key('group', group.pk),
+    ))
+    context.update(fragment_context(generation_key('group', group.pk)))
     return render(request, 'posts/group_list.html', context)
 
 
+@query_budget(queries=6)
+@cache_anonymous_page(profile_keys)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.select_related('group')
-    user = request.user
-    count = posts.count()
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=user, author=author,
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
     )
+    posts = with_cards(author.posts.all())
+    user = request.user
+    count = stats_for(author).posts_count
+    following = is_following(user, author)
     context = {
         'author': author,
         'count': count,
         'following': following,
     }
-    context.update(pageobj(posts, request))
+    context.update(
+        pageobj(posts, request, count_key=count_key('author', author.pk))
+    )
+    context.update(fragment_context(generation_key('author', author.pk)))
     return render(request, 'posts/profile.html', context)
 
 
+@query_budget(queries=4)
+@cache_anonymous_page(post_keys)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    num_post = Post.objects.select_related('author').count()
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
+    num_post = stats_for(post.author).posts_count
     form = CommentForm(request.POST or None)
     context = {
         'form': form,
-        'comments': comments,
+        'comments': comments_page(post.pk),
         'post': post,
         'num_post': num_post,
     }
+    context.update(fragment_context(
+        generation_key('post', post.pk),
+        generation_key('author', post.author_id),
+    ))
     return render(request, 'posts/post_detail.html', context)
 
 
+def label_page(request, kind, name):
+    """Страница ленты метки прямо из индекса, всегда по курсору."""
+    posts = with_cards(tags.feed(kind, name))
+    return CursorPaginator(posts, settings.PAGE, tags.FEED_ORDERING).get_page(
+        request.GET.get('cursor')
+    )
+
+
+@query_budget(queries=3)
+def tag_posts(request, name):
+    name = name.lower()
+    context = {
+        'tag': name,
+        'page_obj': label_page(request, TagEntry.HASHTAG, name),
+    }
+    return render(request, 'posts/tag.html', context)
+
+
+@login_required
+@query_budget(queries=4)
+def mentions(request):
+    context = {
+        'page_obj': label_page(
+            request, TagEntry.MENTION, request.user.username
+        ),
+    }
+    return render(request, 'posts/mentions.html', context)
+
+
+def export_response(request, name, queryset):
+    """Поток CSV или JSONL (?format=), с ?gzip=1 — сжатый на лету.
+
+    Посты читаются, когда сервер отдаёт поток, — уже после view
+    и QueryBudgetMiddleware. Бюджет выгрузок поэтому считает только
+    подготовку ответа: сессию, пользователя и автора или группу.
+    """
+    file_format = request.GET.get('format', 'csv')
+    if file_format not in export.FORMATS:
+        raise Http404
+    compress = request.GET.get('gzip') == '1'
+    response = StreamingHttpResponse(
+        export.stream(queryset, file_format, compress),
+        content_type=(
+            'application/gzip' if compress else export.FORMATS[file_format]
+        ),
+    )
+    response['Content-Disposition'] = 'attachment; filename="{}"'.format(
+        export.filename(name, file_format, compress)
+    )
+    return response
+
+
 @login_required
+@transaction.non_atomic_requests
+@query_budget(queries=3)
+def profile_export(request, username):
+    """Выгрузка постов автора; бюджет — без чтения потока."""
+    author = get_object_or_404(User, username=username)
+    return export_response(
+        request, f'{author.username}-posts', export.posts_of(author=author)
+    )
+
+
+@login_required
+@transaction.non_atomic_requests
+@query_budget(queries=3)
+def group_export(request, slug):
+    """Выгрузка постов группы; бюджет — без чтения потока."""
+    group = get_object_or_404(Group, slug=slug)
+    return export_response(
+        request, f'{group.slug}-posts', export.posts_of(group=group)
+    )
+
+
+@transaction.non_atomic_requests
+@query_budget(queries=2)
+def suggest(request):
+    """Подсказки пользователей и групп по префиксу из индекса в памяти.
+
+    Запросы к базе — только при сборке индекса после старта процесса.
+    """
+    results = autocomplete.suggest(request.GET.get('q', ''))
+    return JsonResponse({'results': results})
+
+
+@query_budget(queries=4)
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = search_page(
+        query,
+        with_cards(Post.objects.all()),
+        settings.PAGE,
+        request.GET.get('cursor'),
+    )
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@query_budget(queries=2)
+def post_comments(request, post_id):
+    """Следующая порция комментариев — HTML-фрагмент для догрузки.
+
+    Существование поста проверяется отдельным запросом, только если
+    первая страница пуста: иначе его доказывают сами комментарии.
+    """
+    cursor = request.GET.get('cursor')
+    comments = comments_page(post_id, cursor)
+    if (not comments and not cursor
+            and not Post.objects.filter(pk=post_id).exists()):
+        raise Http404
+    context = {
+        'post_id': post_id,
+        'comments': comments,
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
+@login_required
+# Пост в группе и с метками; fan-out в ленты добавляет запросы
+# на каждого подписчика автора
+@query_budget(queries=9)
 def post_create(request):
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     if not form.is_valid():
         return render(
             request,
@@ -77,9 +248,12 @@ def post_create(request):
 
 
 @login_required
+# Правка с новыми метками и сменой группы
+@query_budget(queries=11)
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
-    if post.author != request.user:
+    # Сравниваем id, не загружая автора отдельным запросом
+    if post.author_id != request.user.pk:
         return redirect('posts:post_detail', post_id=post_id)
     form = PostForm(
         request.POST or None,
@@ -98,6 +272,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@query_budget(queries=5)
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -110,13 +285,19 @@ def add_comment(request, post_id):
 
 
 @login_required
+# С пустым кешем: join и merge читают подписки, timeline — нет
+@query_budget(queries=5)
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    context = pageobj(posts, request)
+    posts, ordering = follow_feed(request.user)
+    context = pageobj(
+        posts, request, ordering, count_key('follow', request.user.pk)
+    )
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+# Движок timeline: счётчики, дозаполнение ленты и её обрезка
+@query_budget(queries=10)
 def profile_follow(request, username):
     follower = request.user
     author = get_object_or_404(User, username=username)
@@ -126,6 +307,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@query_budget(queries=8)
 def profile_unfollow(request, username):
     follower = request.user
     Follow.objects.filter(
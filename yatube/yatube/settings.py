@@ -50,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -89,6 +90,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Денормализованные счётчики обновляются сигналами; запрос целиком
+        # в транзакции, чтобы запись и счётчики фиксировались вместе
+        'ATOMIC_REQUESTS': True,
     }
 }
 
@@ -142,6 +146,16 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 PAGE = 10
+# Комментариев на странице поста и в каждой догружаемой порции
+COMMENTS_PAGE = 20
+# Сколько секунд хранить в кеше число постов ленты для пагинатора
+FEED_COUNT_TIMEOUT = 60 * 60
+# Фрагменты страниц сбрасываются счётчиками поколений, поэтому живут долго
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 6
+# Целые страницы для анонимных посетителей, с ETag и Last-Modified
+PAGE_CACHE_TIMEOUT = 60 * 60 * 6
+# Отрисованные карточки постов; ключ меняется при правке поста
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
@@ -150,9 +164,86 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Медиафайлы отдаёт core.views.media: только эти каталоги; миниатюры
+# (cache/) неизменны и кешируются браузером на год, остальное — на
+# MEDIA_MAX_AGE секунд
+MEDIA_SERVE_PREFIXES = ('posts/', 'cache/')
+MEDIA_IMMUTABLE_PREFIXES = ('cache/',)
+MEDIA_MAX_AGE = 60 * 60 * 24
+# None — байты отдаёт Django; 'x-accel-redirect' (nginx, internal location
+# MEDIA_ACCEL_PREFIX) или 'x-sendfile' (Apache, lighttpd) — фронтовый прокси
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Загрузки всегда пишутся во временный файл, а не держатся в памяти
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+# Приём изображений (posts.images.ingest): больше IMAGE_MAX_PIXELS не
+# декодируем, оригинал ужимаем до IMAGE_MAX_SIDE по большей стороне.
+# Миниатюры дополнительно готовятся в форматах IMAGE_VARIANTS (в порядке
+# предпочтения для <picture>), если их умеют записывать Pillow и sorl
+IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+IMAGE_MAX_PIXELS = 50_000_000
+IMAGE_MAX_SIDE = 2048
+IMAGE_VARIANTS = ('AVIF', 'WEBP')
+
+# Миниатюры создаются пулом потоков после сохранения поста, шаблоны только
+# находят готовые (posts.thumbnails). THUMBNAIL_SYNC — создавать сразу
+THUMBNAIL_BACKEND = 'posts.thumbnails.RenditionBackend'
+THUMBNAIL_RENDITIONS = {
+    'card_480': ('480x170', {'crop': 'center', 'upscale': True}),
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+    # Растягивать небольшие оригиналы до 1440 пикселей незачем
+    'card_1440': ('1440x508', {'crop': 'center', 'upscale': False}),
+}
+# Наборы миниатюр для srcset: первая подходящая по ширине выбирается
+# браузером по sizes; src — миниатюра default
+IMAGE_SRCSETS = {
+    'card': {
+        'renditions': ('card_480', 'card', 'card_1440'),
+        'default': 'card',
+        'sizes': '(max-width: 992px) 100vw, 960px',
+    },
+}
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_SYNC = False
 
+# Общий для всех процессов кеш в файле SQLite (WAL) с вытеснением LRU
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+            'MAX_SIZE': 256 * 1024 * 1024,
+        },
     }
 }
+
+# Защита от одновременного пересчёта (stampede) фрагментов и счётчиков:
+# устаревшее значение отдаётся ещё STAMPEDE_STALE_TIMEOUT секунд, пока его
+# пересчитывает владелец блокировки; без него остальные ждут до
+# STAMPEDE_WAIT секунд. STAMPEDE_BETA > 1 — пересчёт раньше срока чаще
+STAMPEDE_STALE_TIMEOUT = 60 * 5
+STAMPEDE_LOCK_TIMEOUT = 30
+STAMPEDE_WAIT = 2
+STAMPEDE_BETA = 1.0
+
+# Максимальная длина материализованной ленты подписок одного пользователя
+TIMELINE_LENGTH = 1000
+
+# Проверка бюджетов SQL-запросов из @query_budget: при превышении
+# предупреждение в лог, с QUERY_BUDGET_RAISE — исключение
+QUERY_BUDGET_ENABLED = DEBUG
+QUERY_BUDGET_RAISE = False
+
+# Движок ленты подписок: 'timeline' — материализованная лента (fan-out
+# при записи), 'merge' — слияние кешированных списков постов авторов,
+# 'join' — прямой запрос с соединением Follow и Post
+FOLLOW_FEED_ENGINE = 'timeline'
+
+# Автодополнение пользователей и групп из индекса в памяти процесса:
+# число подсказок и как часто сверяться с поколением индекса в кеше
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_CHECK_INTERVAL = 5